@@ -2,6 +2,7 @@ import os
 import logging
 from flask import Flask
 from extensions import db   # ✅ import db from extensions
+from company_store import init_store
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -11,18 +12,35 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "indian-business-directory-secret-key-2024")
 
 # Configure the database - using SQLite for simplicity
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///business_directory.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///business_directory.db")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
 
+# Rendered page cache (see page_cache); PAGE_CACHE_DIR shares it between gunicorn workers
+app.config["PAGE_CACHE_MB"] = int(os.environ.get("PAGE_CACHE_MB", "32"))
+app.config["PAGE_CACHE_DIR"] = os.environ.get("PAGE_CACHE_DIR")
+
 db.init_app(app)
 
 with app.app_context():
     import models   
+    import company_models
     db.create_all()
 
+    # Serve companies from SQLite once they have been imported
+    # (flask import-companies), otherwise load the JSON file into memory once
+    from company_db import SqlCompanyStore, has_companies
+    data_dir = os.environ.get("COMPANY_DATA_DIR", os.path.join(app.root_path, "data"))
+    if has_companies():
+        init_store(data_dir, SqlCompanyStore())
+    else:
+        init_store(data_dir)
+
+from import_companies import register_cli
+register_cli(app)
+
 import routes
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bitmap filter engine against the old list-comprehension scan.
+
+Loads data/companies.json, builds the bitmap index and a plain list of
+company dicts (what routes.companies() used to filter), then times the
+same filters both ways and reports memory for each representation.
+
+    python bench_filters.py [data/companies.json] [--repeat 5] [--skip-scan]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from bitmap_index import BitmapIndex
+from company_store import CompanyStore, iter_companies
+
+# (filter expression, equivalent per-company predicate for the scan)
+CASES = [
+    ({'state': 'Maharashtra'},
+     lambda c: c['state'].lower() == 'maharashtra'),
+    ({'state': 'Uttar Pradesh', 'sector': 'IT'},
+     lambda c: c['state'].lower() == 'uttar pradesh' and c['sector'].lower() == 'it'),
+    ({'sector': ['IT', 'Software', 'Technology'], 'employees': '1000+'},
+     lambda c: c['sector'] in ('IT', 'Software', 'Technology') and c['employees'] == '1000+'),
+    ({'and': [{'established': '2010-2019'}, {'not': {'employees': ['1-10', '11-50']}}]},
+     lambda c: 2010 <= c['established'] <= 2019 and c['employees'] not in ('1-10', '11-50')),
+    ({'or': [{'state': 'Goa'}, {'state': 'Sikkim', 'sector': 'Tourism'}]},
+     lambda c: c['state'] == 'Goa' or (c['state'] == 'Sikkim' and c['sector'] == 'Tourism')),
+]
+
+
+def timed(fn, repeat):
+    """Median seconds of fn() over repeat runs, plus its last result"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def deep_size(companies):
+    """Approximate bytes held by a list of flat dicts (shared strings counted once)"""
+    seen = set()
+    total = sys.getsizeof(companies)
+    for company in companies:
+        total += sys.getsizeof(company)
+        for value in company.values():
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bitmap filters vs list scan")
+    parser.add_argument('path', nargs='?', default='data/companies.json')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-scan', action='store_true', help="don't build the list of dicts")
+    args = parser.parse_args()
+
+    print(f"Loading {args.path}...")
+    store = CompanyStore.from_json(args.path)
+    started = time.perf_counter()
+    index = BitmapIndex(store)
+    print(f"{len(store):,} companies, bitmaps built in {time.perf_counter() - started:.1f}s")
+
+    bitmap_bytes = sum(sys.getsizeof(bitmap.bits)
+                       for bitmaps in index.bitmaps.values() for bitmap in bitmaps.values())
+    print(f"Bitmap index: {bitmap_bytes / (1024 * 1024):.1f} MB")
+
+    companies = None
+    if not args.skip_scan:
+        companies = list(iter_companies(args.path))
+        print(f"List of dicts: {deep_size(companies) / (1024 * 1024):.1f} MB")
+
+    print(f"\n{'filter':<70} {'matches':>9} {'bitmap':>10} {'scan':>10}")
+    for expr, predicate in CASES:
+        bitmap_time, matched = timed(lambda: len(index.evaluate(expr)), args.repeat)
+        scan = '-'
+        if companies is not None:
+            scan_time, scanned = timed(lambda: len([c for c in companies if predicate(c)]), 1)
+            assert scanned == matched, (expr, scanned, matched)
+            scan = f"{scan_time * 1000:.1f}ms"
+        print(f"{str(expr)[:70]:<70} {matched:>9,} {bitmap_time * 1000:>8.2f}ms {scan:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark fuzzy search against a brute-force edit-distance scan.
+
+Loads the companies (data/companies.json, or a .col file), makes misspelt
+queries from words of the search vocabulary (a letter dropped, doubled,
+swapped for a neighbour or replaced), and reports:
+- how often the intended word is among the spellings FuzzyIndex finds, and
+  how long that lookup takes against comparing the word with every token
+  of the vocabulary by edit distance
+- the latency of the whole fuzzy search (lookup, posting unions and
+  intersection) next to the exact search of the same queries
+
+    python bench_fuzzy.py [data/companies.json] [--queries 500] [--seed 1]
+"""
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+from company_store import CompanyStore
+from fuzzy_index import FuzzyIndex
+from search_index import SearchIndex
+
+# Edit distance accepted by the brute-force scan
+MAX_DISTANCE = 2
+
+
+def misspell(word, rng):
+    """word with one typical typo"""
+    i = rng.randrange(1, len(word))
+    typo = rng.choice(('drop', 'double', 'swap', 'replace'))
+    if typo == 'drop':
+        return word[:i] + word[i + 1:]
+    if typo == 'double':
+        return word[:i] + word[i] + word[i:]
+    if typo == 'swap' and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 once it is certain to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def percentiles(times):
+    times = sorted(times)
+    return (statistics.median(times) * 1000, times[int(len(times) * 0.95)] * 1000,
+            times[-1] * 1000)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigram fuzzy search vs edit-distance scan")
+    parser.add_argument('path', nargs='?', default='data/companies.json')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Loading {args.path}...")
+    started = time.perf_counter()
+    if args.path.endswith('.col'):
+        store = CompanyStore.from_columnar(args.path)
+    else:
+        store = CompanyStore.from_json(args.path)
+    if store.search_index is None:
+        store.search_index = SearchIndex(store)
+    index = store.search_index
+    print(f"{len(store):,} companies, {len(index.vocabulary):,} distinct words "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    build_time, fuzzy = timed(FuzzyIndex, index.vocabulary)
+    index.fuzzy = fuzzy
+    print(f"Fuzzy index: {len(fuzzy):,} phonetic keys built in {build_time * 1000:.0f}ms")
+
+    rng = random.Random(args.seed)
+    words = [word for word in index.vocabulary if len(word) >= 5 and word.isalpha()]
+    cases = [(word, misspell(word, rng)) for word in rng.choices(words, k=args.queries)]
+
+    lookup_times, scan_times = [], []
+    found = scanned = 0
+    for word, typo in cases:
+        elapsed, similar = timed(fuzzy.similar, typo)
+        lookup_times.append(elapsed)
+        found += word in similar
+        elapsed, matches = timed(lambda: [token for token in index.vocabulary
+                                          if edit_distance(typo, token, MAX_DISTANCE) <= MAX_DISTANCE])
+        scan_times.append(elapsed)
+        scanned += word in matches
+
+    print(f"\n{'intended word found':<28} {'trigram index':>14} {'edit-distance scan':>20}")
+    print(f"{'':<28} {found / len(cases):>13.0%} {scanned / len(cases):>19.0%}")
+    print(f"\n{'latency (ms)':<28} {'p50':>8} {'p95':>8} {'max':>8}")
+    print("{:<28} {:>8.3f} {:>8.3f} {:>8.3f}".format('trigram lookup', *percentiles(lookup_times)))
+    print("{:<28} {:>8.3f} {:>8.3f} {:>8.3f}".format('edit-distance scan', *percentiles(scan_times)))
+
+    # Whole searches: one misspelt word, and a misspelt word next to a correct one
+    queries = [typo for _, typo in cases[:len(cases) // 2]]
+    queries += [f"{typo} {rng.choice(words)}" for _, typo in cases[len(cases) // 2:]]
+    exact_times, fuzzy_times = [], []
+    for query in queries:
+        exact_times.append(timed(index.search, query)[0])
+        fuzzy_times.append(timed(index.fuzzy_search, query)[0])
+    print("{:<28} {:>8.3f} {:>8.3f} {:>8.3f}".format('exact search', *percentiles(exact_times)))
+    print("{:<28} {:>8.3f} {:>8.3f} {:>8.3f}".format('fuzzy search', *percentiles(fuzzy_times)))
+
+
+if __name__ == "__main__":
+    main()
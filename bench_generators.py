@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch company generation against the per-record path.
+
+Generates the same number of companies for one state with
+generate_company_data() (one dict and ~15 random calls at a time), with
+generate_company_batch() (random columns drawn in bulk) and with the batch
+path drawing first names from a NamePool, checks they produce the same
+fields, and reports records per second. It also times generate_companies.py
+with Faker per call and with pooled Faker values.
+
+    python bench_generators.py [--count 100000] [--state Maharashtra] [--seed 1]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import generate_companies
+import generate_million_companies as gen
+from name_pool import NamePool
+
+
+def timed(fn):
+    """Seconds taken by fn(), plus its result"""
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs per-record company generation")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--state', default='Maharashtra')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    state_info = next((s for s in gen.states_data if s['name'] == args.state), None)
+    if state_info is None:
+        parser.error(f"Unknown state {args.state!r}")
+
+    random.seed(args.seed)
+    gen.fake.seed_instance(args.seed)
+    record_time, records = timed(
+        lambda: [gen.generate_company_data(i + 1, state_info) for i in range(args.count)])
+
+    random.seed(args.seed)
+    gen.fake.seed_instance(args.seed)
+    batch_time, batch = timed(lambda: gen.generate_company_batch(1, args.count, state_info))
+
+    random.seed(args.seed)
+    # The pool is sampled inside the timing, as a generator run would
+    pooled_time, pooled = timed(lambda: gen.generate_company_batch(
+        1, args.count, state_info, gen.seeded_name_pool(args.seed, 10000)))
+
+    for other in (batch, pooled):
+        assert [list(c) for c in records[:1]] == [list(c) for c in other[:1]], "field order differs"
+        assert all(type(a[k]) is type(b[k]) for a, b in zip(records, other) for k in a), \
+            "field types differ"
+
+    print(f"{args.count:,} companies for {args.state}")
+    for label, seconds in (('per-record', record_time), ('batch', batch_time),
+                           ('batch + name pool', pooled_time)):
+        print(f"  {label:<18} {seconds:6.2f}s {args.count / seconds:>10,.0f} records/s "
+              f"{record_time / seconds:5.1f}x")
+
+    print("\ngenerate_companies.py")
+    faker = generate_companies.fake
+    for label, fake in (('Faker per call', faker), ('name pool', NamePool(faker, 5000))):
+        generate_companies.fake = fake
+        random.seed(args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, companies = timed(generate_companies.generate_companies)
+        print(f"  {label:<18} {seconds:6.2f}s {len(companies) / seconds:>10,.0f} records/s")
+    generate_companies.fake = faker
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Bitmap indexes for filtering and faceted search.
+
+Each value of a facet column (state, district, sector, employee band and
+establishment-year bucket) owns a bitmap of the rows holding it. A bitmap
+is a Python int plus the row its first bit stands for, so a district whose
+companies sit in one stretch of the file only costs that stretch. AND, OR,
+NOT and popcount run inside CPython's big-int code, so any combination of
+filters is evaluated as bitmap algebra in milliseconds, even on the
+million-row dataset.
+
+Filter expressions are plain dicts, as they arrive from JSON:
+
+    {"state": "Bihar", "sector": ["IT", "Software"]}          state AND (IT OR Software)
+    {"or": [{"district": "Pune"}, {"district": "Mumbai"}]}
+    {"and": [{"established": "1990-1999"}, {"not": {"employees": "1-10"}}]}
+
+Keys in one dict are ANDed, and a list of values for a facet is ORed.
+Values are strings; established takes bucket labels like "1990-1999".
+validate_filter checks an expression before either store evaluates it.
+"""
+
+import re
+
+FACETS = ('state', 'district', 'sector', 'employees', 'established')
+
+# Facets stored as CategoryColumns on the store; established is bucketed
+CATEGORY_FACETS = ('state', 'district', 'sector', 'employees')
+
+YEAR_BUCKET = 10
+
+# Deepest nesting of and/or/not a filter expression may use
+MAX_FILTER_DEPTH = 16
+
+# Bytes popcounted at a time by Bitmap.row_at
+ROW_AT_CHUNK = 64
+
+_YEAR_BUCKET_LABEL = re.compile(r'(\d{1,4})-(\d{1,4})')
+
+
+def year_bucket(year):
+    """Label of the establishment-year bucket holding a year, e.g. '1990-1999'"""
+    start = year - year % YEAR_BUCKET
+    return f"{start}-{start + YEAR_BUCKET - 1}"
+
+
+def parse_year_bucket(label):
+    """(first, last) year of a bucket label such as '1990-1999'; raises ValueError"""
+    match = _YEAR_BUCKET_LABEL.fullmatch(label) if isinstance(label, str) else None
+    if match:
+        first, last = int(match[1]), int(match[2])
+        if first % YEAR_BUCKET == 0 and last == first + YEAR_BUCKET - 1:
+            return first, last
+    raise ValueError(f"Unknown established bucket {label!r}")
+
+
+def validate_filter(expr, depth=0):
+    """Raise ValueError unless expr is a filter expression both stores evaluate alike"""
+    if depth > MAX_FILTER_DEPTH:
+        raise ValueError(f"Filter is nested more than {MAX_FILTER_DEPTH} levels deep")
+    if isinstance(expr, list):
+        expr = {'and': expr}
+    if not isinstance(expr, dict):
+        raise ValueError(f"Filter must be an object, not {expr!r}")
+
+    for key, value in expr.items():
+        if key in ('and', 'or'):
+            if not isinstance(value, list):
+                raise ValueError(f"'{key}' takes a list of filters")
+            for part in value:
+                validate_filter(part, depth + 1)
+        elif key == 'not':
+            validate_filter(value, depth + 1)
+        elif key in FACETS:
+            for item in (value if isinstance(value, list) else [value]):
+                if not isinstance(item, str) or not item:
+                    raise ValueError(f"'{key}' takes non-empty strings, not {item!r}")
+                if key == 'established':
+                    parse_year_bucket(item)
+        else:
+            raise ValueError(f"Unknown filter {key!r}")
+
+
+class Bitmap:
+    """Set of row numbers: bit i of `bits` is row `offset + i`"""
+
+    __slots__ = ('bits', 'offset')
+
+    def __init__(self, bits=0, offset=0):
+        if bits:
+            # Drop trailing zero bits so equal sets have equal representations
+            zeros = (bits & -bits).bit_length() - 1
+            bits >>= zeros
+            offset += zeros
+        else:
+            offset = 0
+        self.bits = bits
+        self.offset = offset
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Bitmap of sorted row numbers"""
+        if not rows:
+            return cls()
+        first = rows[0]
+        buffer = bytearray(((rows[-1] - first) >> 3) + 1)
+        for row in rows:
+            row -= first
+            buffer[row >> 3] |= 1 << (row & 7)
+        return cls(int.from_bytes(buffer, 'little'), first)
+
+    @classmethod
+    def full(cls, size):
+        return cls((1 << size) - 1)
+
+    @property
+    def end(self):
+        """One past the last row"""
+        return self.offset + self.bits.bit_length()
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __and__(self, other):
+        low = max(self.offset, other.offset)
+        if low >= min(self.end, other.end):
+            return Bitmap()
+        return Bitmap((self.bits >> (low - self.offset)) & (other.bits >> (low - other.offset)), low)
+
+    def __or__(self, other):
+        if not self:
+            return other
+        if not other:
+            return self
+        low = min(self.offset, other.offset)
+        return Bitmap((self.bits << (self.offset - low)) | (other.bits << (other.offset - low)), low)
+
+    def __sub__(self, other):
+        """Rows in self but not in other"""
+        return Bitmap(self.bits ^ (self & other).shifted_to(self.offset), self.offset)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and (self.bits, self.offset) == (other.bits, other.offset)
+
+    def shifted_to(self, offset):
+        """Raw bits re-based on an offset at or below self.offset"""
+        return self.bits << (self.offset - offset) if self.bits else 0
+
+    def rows_after(self, row=-1, limit=20):
+        """Up to `limit` rows greater than `row`, and whether more follow"""
+        start = max(row + 1 - self.offset, 0)
+        bits = self.bits >> start
+        rows = []
+        while bits and len(rows) < limit:
+            lowest = (bits & -bits).bit_length() - 1
+            rows.append(self.offset + start + lowest)
+            bits >>= lowest + 1
+            start += lowest + 1
+        return rows, bits != 0
+
+    def row_at(self, index):
+        """The row at a 0-based position in the set, or None past the end"""
+        if index < 0 or not self.bits:
+            return None
+        # Count whole chunks by popcount, then step through the chunk holding it
+        data = self.bits.to_bytes((self.bits.bit_length() + 7) >> 3, 'little')
+        for start in range(0, len(data), ROW_AT_CHUNK):
+            chunk = int.from_bytes(data[start:start + ROW_AT_CHUNK], 'little')
+            n = chunk.bit_count()
+            if index < n:
+                for _ in range(index):
+                    chunk &= chunk - 1
+                return self.offset + start * 8 + (chunk & -chunk).bit_length() - 1
+            index -= n
+        return None
+
+    def rows_before(self, row, limit=20):
+        """Up to `limit` rows smaller than `row` (ascending), and whether more precede"""
+        width = row - self.offset
+        bits = self.bits & ((1 << width) - 1) if width > 0 else 0
+        rows = []
+        while bits and len(rows) < limit:
+            highest = bits.bit_length() - 1
+            rows.append(self.offset + highest)
+            bits &= (1 << highest) - 1
+        rows.reverse()
+        return rows, bits != 0
+
+
+class BitmapIndex:
+    """Value -> Bitmap for each facet column of a CompanyStore"""
+
+    def __init__(self, store):
+        self.size = len(store)
+        self.universe = Bitmap.full(self.size)
+        self.bitmaps = {}
+        self.names = {}
+        for facet in CATEGORY_FACETS:
+            self.bitmaps[facet], self.names[facet] = _column_bitmaps(getattr(store, facet))
+        self.bitmaps['established'], self.names['established'] = _year_bitmaps(store.established)
+
+    @classmethod
+    def from_bitmaps(cls, size, bitmaps, names):
+        """Index over bitmaps built earlier (e.g. read from a columnar file)"""
+        index = cls.__new__(cls)
+        index.size = size
+        index.universe = Bitmap.full(size)
+        index.bitmaps = bitmaps
+        index.names = names
+        return index
+
+    def value_bitmap(self, facet, value):
+        return self.bitmaps[facet].get(str(value).lower(), Bitmap())
+
+    def evaluate(self, expr):
+        """Bitmap of the rows matching a filter expression; raises ValueError"""
+        validate_filter(expr)
+        return self._evaluate(expr)
+
+    def _evaluate(self, expr):
+        if isinstance(expr, list):
+            expr = {'and': expr}
+
+        result = self.universe
+        for key, value in expr.items():
+            if key in ('and', 'or'):
+                parts = [self._evaluate(part) for part in value]
+                if key == 'and':
+                    part = self.universe
+                    for bitmap in parts:
+                        part = part & bitmap
+                else:
+                    part = Bitmap()
+                    for bitmap in parts:
+                        part = part | bitmap
+            elif key == 'not':
+                part = self.universe - self._evaluate(value)
+            else:
+                part = Bitmap()
+                for item in (value if isinstance(value, list) else [value]):
+                    part = part | self.value_bitmap(key, item)
+            result = result & part
+        return result
+
+    def filter_bitmap(self, filters, skip=None):
+        """Rows matching every {facet: value} filter except the skipped facet"""
+        result = self.universe
+        for facet, value in filters.items():
+            if value and facet != skip:
+                result = result & self.value_bitmap(facet, value)
+        return result
+
+    def facet_counts(self, base, filters):
+        """Counts per facet value within base.
+
+        Each facet is counted with the other facets' filters applied but not
+        its own, so the sidebar still shows the alternatives to a selection.
+        """
+        counts = {}
+        for facet in FACETS:
+            mask = base & self.filter_bitmap(filters, skip=facet)
+            values = {}
+            if mask:
+                for key, bitmap in self.bitmaps[facet].items():
+                    if not key:
+                        continue  # companies without a value (the SQL store counts NULL the same way)
+                    n = len(mask & bitmap)
+                    if n:
+                        values[self.names[facet][key]] = n
+            counts[facet] = values
+        return counts
+
+
+def _year_bitmaps(years):
+    """Bitmaps keyed by establishment-year bucket label"""
+    rows_by_bucket = {}
+    for row, year in enumerate(years):
+        if year:
+            rows_by_bucket.setdefault(year - year % YEAR_BUCKET, []).append(row)
+
+    bitmaps = {}
+    for start in sorted(rows_by_bucket):
+        label = year_bucket(start)
+        bitmaps[label] = Bitmap.from_rows(rows_by_bucket[start])
+    return bitmaps, {label: label for label in bitmaps}
+
+
+def _column_bitmaps(column):
+    """Bitmaps keyed by lower-cased value of a CategoryColumn, plus display names"""
+    rows_by_code = [[] for _ in column.values]
+    for row, code in enumerate(column.codes):
+        rows_by_code[code].append(row)
+
+    bitmaps = {}
+    names = {}
+    for value, rows in zip(column.values, rows_by_code):
+        key = value.lower()
+        bitmap = Bitmap.from_rows(rows)
+        bitmaps[key] = bitmaps[key] | bitmap if key in bitmaps else bitmap
+        names.setdefault(key, value)
+    return bitmaps, names
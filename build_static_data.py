@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Split the company dataset into static shard files for simple_index.html.
+
+Writes one JSON file per (state, district) under data/shards/ and a small
+data/shards/manifest.json listing every shard with its company count. The
+page loads only the manifest at start-up and fetches a shard when a state
+or district is chosen (or a page of the full listing needs it), so nothing
+close to the whole dataset is ever parsed in the browser.
+
+A shard holds its rows as arrays in the manifest's field order; state and
+district are implied by the shard:
+
+    {"state": "Bihar", "district": "Gaya", "fields": ["id", "name", ...],
+     "rows": [[1, "Shree Sharma Ltd", ...], ...]}
+
+Search uses a prebuilt token index in data/shards/search/, one file per
+first character of the token (a.bin, b.bin, ... 9.bin), so a query only
+fetches the files for its own words. Companies are numbered by their
+position in the manifest's shard order. Each file is:
+
+    4-byte little-endian header length
+    JSON header: {"tokens": [[token, start, length, count], ...]}, sorted by token
+    posting lists: each token's company numbers as varint-encoded gaps
+
+The input is streamed and rows are written out in batches, so memory stays
+small on the million-company dataset.
+
+    python build_static_data.py [data/companies.json] [data/shards]
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from array import array
+
+from company_store import iter_companies
+from search_index import tokenize
+
+# Every company field except state and district, which the shard implies
+FIELDS = ('id', 'name', 'director', 'phone', 'email', 'website', 'address', 'pincode',
+          'sector', 'established', 'employees')
+
+# Buffered rows across all shards before they are appended to their files
+MAX_PENDING = 50000
+
+# Fields the static search covers, as in search_index.SearchIndex
+SEARCH_FIELDS = ('name', 'director', 'state', 'district', 'sector')
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'unknown'
+
+
+class ShardFile:
+    """One (state, district) shard, appended to in batches"""
+
+    def __init__(self, out_dir, state, district, file):
+        self.path = os.path.join(out_dir, file)
+        self.state = state
+        self.district = district
+        self.file = file
+        self.count = 0
+        self.pending = []
+
+    def add(self, company):
+        row = [company.get(field) for field in FIELDS]
+        self.pending.append(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.count == 0:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            header = json.dumps({'state': self.state, 'district': self.district,
+                                 'fields': FIELDS}, ensure_ascii=False, separators=(',', ':'))
+            text = header[:-1] + ',"rows":[' + ','.join(self.pending)
+            mode = 'w'
+        else:
+            text = ',' + ','.join(self.pending)
+            mode = 'a'
+        with open(self.path, mode, encoding='utf-8') as f:
+            f.write(text)
+        self.count += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(']}')
+
+
+def remove_old_shards(out_dir):
+    """Delete the shard and search files listed by an existing manifest"""
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = [district['file'] for state in manifest.get('states', [])
+             for district in state.get('districts', [])]
+    files.extend(manifest.get('search', {}).get('files', {}).values())
+    for file in files:
+        # Along with any precompressed copies (see data_assets)
+        for path in (os.path.join(out_dir, file + suffix) for suffix in ('', '.gz', '.br')):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _varint_gaps(ordinals):
+    """Sorted numbers as LEB128 varints of the gaps between them"""
+    out = bytearray()
+    previous = 0
+    for ordinal in ordinals:
+        gap = ordinal - previous
+        previous = ordinal
+        while gap >= 0x80:
+            out.append(gap & 0x7f | 0x80)
+            gap >>= 7
+        out.append(gap)
+    return out
+
+
+def build_search_index(out_dir, manifest):
+    """Write the per-first-character token files for the shards in a manifest"""
+    postings = {}
+    ordinal = 0
+    for state in manifest['states']:
+        for district in state['districts']:
+            with open(os.path.join(out_dir, district['file']), 'r', encoding='utf-8') as f:
+                shard = json.load(f)
+            fields = shard['fields']
+            # State and district are the same for the whole shard
+            shared = set(tokenize(shard['state'])) | set(tokenize(shard['district']))
+            columns = [fields.index(field) for field in SEARCH_FIELDS if field in fields]
+            for row in shard['rows']:
+                tokens = set(shared)
+                for column in columns:
+                    tokens.update(tokenize(row[column] or ''))
+                for token in tokens:
+                    rows = postings.get(token)
+                    if rows is None:
+                        rows = postings[token] = array('I')
+                    rows.append(ordinal)
+                ordinal += 1
+
+    by_char = {}
+    for token in sorted(postings):
+        by_char.setdefault(token[0], []).append(token)
+
+    os.makedirs(os.path.join(out_dir, 'search'), exist_ok=True)
+    files = {}
+    for char, tokens in by_char.items():
+        header = []
+        body = bytearray()
+        for token in tokens:
+            data = _varint_gaps(postings[token])
+            header.append([token, len(body), len(data), len(postings[token])])
+            body += data
+        header = json.dumps({'tokens': header}, separators=(',', ':')).encode('utf-8')
+        files[char] = f"search/{char}.bin"
+        with open(os.path.join(out_dir, files[char]), 'wb') as f:
+            f.write(len(header).to_bytes(4, 'little') + header + body)
+    return {'fields': SEARCH_FIELDS, 'files': files}
+
+
+def build_static_data(json_path, out_dir='data/shards'):
+    """Write the shards and manifest for a JSON or NDJSON dataset; returns the manifest"""
+    remove_old_shards(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Shards in the order their first company appears, grouped by state
+    states = {}
+    files = set()
+    pending = 0
+    for company in iter_companies(json_path):
+        state = company.get('state') or ''
+        district = company.get('district') or ''
+        districts = states.setdefault(state, {})
+        shard = districts.get(district)
+        if shard is None:
+            file = f"{slugify(state)}/{slugify(district)}.json"
+            suffix = 2
+            while file in files:
+                file = f"{slugify(state)}/{slugify(district)}-{suffix}.json"
+                suffix += 1
+            files.add(file)
+            shard = districts[district] = ShardFile(out_dir, state, district, file)
+        shard.add(company)
+        pending += 1
+        if pending >= MAX_PENDING:
+            for districts in states.values():
+                for shard in districts.values():
+                    shard.flush()
+            pending = 0
+
+    manifest = {'total': 0, 'fields': FIELDS, 'states': []}
+    for state, districts in states.items():
+        entry = {'name': state, 'count': 0, 'districts': []}
+        for shard in districts.values():
+            shard.close()
+            entry['districts'].append({'name': shard.district, 'count': shard.count,
+                                       'file': shard.file})
+            entry['count'] += shard.count
+        manifest['states'].append(entry)
+        manifest['total'] += entry['count']
+
+    manifest['search'] = build_search_index(out_dir, manifest)
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build static shard files for simple_index.html")
+    parser.add_argument('json_path', nargs='?', default='data/companies.json')
+    parser.add_argument('out_dir', nargs='?', default='data/shards')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = build_static_data(args.json_path, args.out_dir)
+    shards = sum(len(state['districts']) for state in manifest['states'])
+    print(f"Wrote {manifest['total']:,} companies to {shards} shards in {args.out_dir} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Binary columnar file for the company dataset (data/companies.col).
+
+The file holds the same columns CompanyStore keeps in memory, so loading
+it is a memory map instead of a JSON parse:
+- id and established year are fixed-width integer arrays
+- name, director, email, website and address are UTF-8 heaps with offsets
+- phone and pincode are packed integers (see company_store.DigitsColumn)
+- state, district, sector and employee band are small integer codes into
+  a dictionary of values
+
+It can also hold the store's indexes (id -> row, rows per state, district
+and sector, company counts, search posting lists and facet bitmaps), so a
+process that maps the file does no index building or counting at all.
+Every gunicorn worker then maps the same read-only pages, and adding
+workers barely adds memory. The one exception is the facet bitmaps: a
+Bitmap is a Python int, so each one is decoded into a private copy the
+first time a process uses it (about 7 MB for all of them on the
+million-company dataset).
+
+Layout: an 8-byte magic, the length of a JSON table of contents, the table
+itself, then 8-byte aligned sections. Each integer section is written with
+the narrowest array typecode its values fit in, and the table records
+where each section starts and which typecode it uses.
+
+Convert an existing dataset:   python columnar_format.py data/companies.json data/companies.col
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from collections.abc import Mapping
+
+from bitmap_index import Bitmap, BitmapIndex
+from search_index import PostingList, SearchIndex
+
+MAGIC = b'IBDCOL\x00\x01'
+
+INT_COLUMNS = ('ids', 'established')
+STRING_COLUMNS = ('name', 'director', 'email', 'website', 'address')
+DIGITS_COLUMNS = ('phone', 'pincode')
+CATEGORY_COLUMNS = ('state', 'district', 'sector', 'employees')
+ROW_INDEXES = ('rows_by_state', 'rows_by_district', 'rows_by_sector')
+
+_ALIGN = 8
+
+
+def _align(size):
+    return -size % _ALIGN
+
+
+def _narrowest(values):
+    """Smallest unsigned array typecode that holds every value"""
+    largest = max(values, default=0)
+    for typecode in 'BHIQ':
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    raise ValueError(f"Value {largest} does not fit in 64 bits")
+
+
+def write_columnar(store, path):
+    """Write the columns of a CompanyStore, and whichever of its indexes are built"""
+    sections = []
+    size = 0
+
+    def section(values, typecode=None):
+        nonlocal size
+        if typecode is None:
+            typecode = _narrowest(values)
+            values = array(typecode, values)
+        data = memoryview(values).cast('B')
+        sections.append(data)
+        descriptor = {'offset': size, 'type': typecode, 'count': len(values)}
+        size += len(data) + _align(len(data))
+        return descriptor
+
+    columns = {}
+    for name in INT_COLUMNS:
+        columns[name] = {'values': section(getattr(store, name))}
+    for name in STRING_COLUMNS:
+        column = getattr(store, name)
+        columns[name] = {'heap': section(column.heap, 'B'), 'offsets': section(column.offsets)}
+    for name in DIGITS_COLUMNS:
+        column = getattr(store, name)
+        columns[name] = {'packed': section(column.packed), 'prefix': column.prefix,
+                         'width': column.width,
+                         'extras': {str(row): value for row, value in column.extras.items()}}
+    for name in CATEGORY_COLUMNS:
+        column = getattr(store, name)
+        columns[name] = {'codes': section(column.codes), 'values': column.values}
+
+    indexes = {}
+    if len(store.row_of_id):
+        indexes['row_of_id'] = section(store.row_of_id, 'i')
+        for name in ROW_INDEXES:
+            indexes[name] = _grouped_sections(section, getattr(store, name))
+        indexes['counts'] = [[*key, n] for key, n in store.count_triples().items()]
+    if store.search_index is not None:
+        indexes['postings'] = _posting_sections(section, store.search_index.postings)
+    if store.bitmap_index is not None:
+        indexes['bitmaps'] = _bitmap_sections(section, store.bitmap_index)
+
+    toc = json.dumps({'rows': len(store), 'byteorder': sys.byteorder, 'columns': columns,
+                      'indexes': indexes},
+                     ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header = MAGIC + len(toc).to_bytes(8, 'little') + toc
+    with open(path, 'wb') as f:
+        f.write(header + bytes(_align(len(header))))
+        for data in sections:
+            f.write(data)
+            f.write(bytes(_align(len(data))))
+
+
+def _grouped_sections(section, index):
+    """{key: rows} as one rows section with offsets, keys in the table"""
+    keys = list(index)
+    rows = array('I')
+    offsets = [0]
+    for key in keys:
+        rows.extend(index[key])
+        offsets.append(len(rows))
+    return {'keys': keys, 'offsets': section(offsets), 'rows': section(rows)}
+
+
+def _posting_sections(section, postings):
+    """Posting list deltas concatenated into one section per width"""
+    typecodes = {1: 'B', 2: 'H', 4: 'I'}
+    packed = {typecode: array(typecode) for typecode in typecodes.values()}
+    tokens = {}
+    for token, posting in postings.items():
+        typecode = typecodes[posting.deltas.itemsize]
+        deltas = packed[typecode]
+        tokens[token] = [typecode, len(deltas), len(posting.deltas)]
+        deltas.extend(posting.deltas)
+    return {'tokens': tokens,
+            'deltas': {typecode: section(deltas, typecode) for typecode, deltas in packed.items()}}
+
+
+def _bitmap_sections(section, index):
+    """Facet bitmaps as little-endian bytes in one section"""
+    bits = bytearray()
+    facets = {}
+    for facet, bitmaps in index.bitmaps.items():
+        entries = facets[facet] = []
+        for key, bitmap in bitmaps.items():
+            data = bitmap.bits.to_bytes((bitmap.bits.bit_length() + 7) // 8, 'little')
+            entries.append([key, index.names[facet][key], bitmap.offset, len(bits), len(data)])
+            bits += data
+    return {'facets': facets, 'bits': section(bits, 'B')}
+
+
+class ColumnarFile:
+    """Read-only memory map of a columnar file; sections come back as zero-copy views"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a company columnar file")
+        toc_start = len(MAGIC) + 8
+        toc_end = toc_start + int.from_bytes(view[len(MAGIC):toc_start], 'little')
+        toc = json.loads(bytes(view[toc_start:toc_end]))
+        if toc['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {toc['byteorder']}-endian machine")
+        self.rows = toc['rows']
+        self.columns = toc['columns']
+        self.indexes = toc.get('indexes', {})
+        self.data = view[toc_end + _align(toc_end):]
+
+    def section(self, descriptor):
+        """memoryview of a section, cast to its typecode"""
+        typecode = descriptor['type']
+        start = descriptor['offset']
+        end = start + descriptor['count'] * array(typecode).itemsize
+        view = self.data[start:end]
+        return view if typecode == 'B' else view.cast(typecode)
+
+    def grouped(self, name):
+        """A saved {key: rows} index; keys saved from tuples come back as tuples"""
+        descriptor = self.indexes[name]
+        offsets = self.section(descriptor['offsets'])
+        rows = self.section(descriptor['rows'])
+        return {tuple(key) if isinstance(key, list) else key: rows[offsets[i]:offsets[i + 1]]
+                for i, key in enumerate(descriptor['keys'])}
+
+    def postings(self):
+        """Saved search posting lists, token -> PostingList over mapped deltas"""
+        descriptor = self.indexes['postings']
+        deltas = {typecode: self.section(section)
+                  for typecode, section in descriptor['deltas'].items()}
+        return {token: PostingList.from_deltas(deltas[typecode][start:start + count])
+                for token, (typecode, start, count) in descriptor['tokens'].items()}
+
+    def counts(self):
+        """Saved company counts per (state, district, sector), or None"""
+        if 'counts' not in self.indexes:
+            return None
+        return {(state, district, sector): n
+                for state, district, sector, n in self.indexes['counts']}
+
+    def bitmaps(self):
+        """Saved facet bitmaps and display names, as BitmapIndex keeps them"""
+        descriptor = self.indexes['bitmaps']
+        bits = self.section(descriptor['bits'])
+        bitmaps = {}
+        names = {}
+        for facet, entries in descriptor['facets'].items():
+            bitmaps[facet] = MappedBitmaps(bits, {key: (offset, start, length)
+                                                  for key, _, offset, start, length in entries})
+            names[facet] = {key: name for key, name, *_ in entries}
+        return bitmaps, names
+
+
+class MappedBitmaps(Mapping):
+    """Value -> Bitmap over saved bits, each decoded the first time it is looked up"""
+
+    def __init__(self, bits, entries):
+        self.bits = bits
+        self.entries = entries  # key -> (row offset, byte start, byte length)
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        bitmap = self.decoded.get(key)
+        if bitmap is None:
+            offset, start, length = self.entries[key]
+            bitmap = Bitmap(int.from_bytes(self.bits[start:start + length], 'little'), offset)
+            self.decoded[key] = bitmap
+        return bitmap
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def convert(json_path, columnar_path):
+    """Stream a JSON or NDJSON dataset into a columnar file with all its indexes;
+    returns the row count"""
+    from company_store import CompanyStore, iter_companies
+
+    store = CompanyStore()
+    for company in iter_companies(json_path):
+        store.append(company)
+    store.build_indexes()
+    store.search_index = SearchIndex(store)
+    store.bitmap_index = BitmapIndex(store)
+    write_columnar(store, columnar_path)
+    return len(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert companies JSON to the columnar format")
+    parser.add_argument('json_path', nargs='?', default='data/companies.json')
+    parser.add_argument('columnar_path', nargs='?', default='data/companies.col')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = convert(args.json_path, args.columnar_path)
+    print(f"Wrote {rows:,} companies to {args.columnar_path} in {time.perf_counter() - started:.1f}s")
+    json_size = os.path.getsize(args.json_path)
+    columnar_size = os.path.getsize(args.columnar_path)
+    print(f"{args.json_path}: {json_size / (1024 * 1024):.1f} MB, "
+          f"{args.columnar_path}: {columnar_size / (1024 * 1024):.1f} MB "
+          f"({json_size / columnar_size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""
+SQLite-backed company store.
+
+Offers the same methods routes use on company_store.CompanyStore, answered
+with indexed queries against the companies table. Pages are fetched by
+keyset (id > last seen id) so every page costs the same and no worker keeps
+the dataset in memory.
+
+Text search goes through the companies_fts FTS5 table, which the importer
+rebuilds after every load. Results are ordered by BM25 relevance and paged
+by (score, id).
+"""
+
+import threading
+import time
+from collections import Counter
+
+from markupsafe import Markup
+from sqlalchemy import and_, false, func, not_, or_, text, true
+
+from bitmap_index import FACETS, YEAR_BUCKET, parse_year_bucket, validate_filter, year_bucket
+
+from company_models import Company, CompanyCount, CompanyImport
+from company_store import count_summary
+from extensions import db
+from fuzzy_index import FuzzyIndex
+from pagination import InvalidCursor
+from search_index import tokenize
+from suggest_index import MAX_SUGGESTIONS, SuggestIndex
+
+FTS_TABLE = 'companies_fts'
+FTS_COLUMNS = ('name', 'director', 'address', 'district', 'state', 'sector')
+
+# Relevance weight of each FTS column, in FTS_COLUMNS order
+FTS_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 2.0, 3.0)
+
+# Snippet markers; replaced by <mark> after the text is HTML-escaped
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# Seconds SqlCompanyStore.version reuses the import it last read, so cached
+# pages are served without a query; a new import shows within this time
+VERSION_TTL = 5
+
+_FIELDS = ', '.join(f'c.{field}' for field in Company.FIELDS)
+_SCORE = f"bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))})"
+
+
+def create_fts_statements():
+    """SQL that (re)creates the FTS index from the companies table"""
+    return [
+        f"DROP TABLE IF EXISTS {FTS_TABLE}",
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, content='companies', content_rowid='id', prefix='2 3')",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')",
+    ]
+
+
+def match_expression(query, similar=None):
+    """FTS5 MATCH string: every word must match, the last one as a prefix.
+
+    similar(term), when given, lists other spellings each word may match
+    instead (fuzzy search).
+    """
+    terms = tokenize(query)
+    if not terms:
+        return None
+    groups = []
+    for i, term in enumerate(terms):
+        phrases = [f'"{term}"*' if i == len(terms) - 1 else f'"{term}"']
+        if similar:
+            phrases.extend(f'"{token}"' for token in similar(term) if token != term)
+        groups.append(phrases[0] if len(phrases) == 1 else f"({' OR '.join(phrases)})")
+    # FTS5 needs an explicit AND after a parenthesised group
+    return ' AND '.join(groups)
+
+
+def _highlight(snippet):
+    return Markup(str(Markup.escape(snippet))
+                  .replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def has_companies():
+    """True once companies have been imported into the database"""
+    return db.session.query(Company.id).limit(1).first() is not None
+
+
+def _facet_column(facet):
+    if facet == 'established':
+        # Bucket start year, e.g. 1990 for 1990-1999
+        return (Company.established // YEAR_BUCKET) * YEAR_BUCKET
+    return getattr(Company, facet)
+
+
+def _facet_condition(facet, value):
+    """Never NULL, so NOT of it also matches the companies without a value,
+    as the bitmap index's NOT does"""
+    if isinstance(value, list):
+        return or_(false(), *(_facet_condition(facet, item) for item in value))
+    column = getattr(Company, facet)
+    if facet == 'established':
+        first, last = parse_year_bucket(value)
+        condition = column.between(first, last)
+    elif facet == 'employees':
+        # The bitmap index matches values case-insensitively; other facets are NOCASE columns
+        condition = column.collate('NOCASE') == value
+    else:
+        condition = column == value
+    return and_(column.isnot(None), condition) if column.nullable else condition
+
+
+def _condition(expr):
+    """SQL condition for a filter expression; raises ValueError like BitmapIndex.evaluate"""
+    validate_filter(expr)
+    return _expression(expr)
+
+
+def _expression(expr):
+    if isinstance(expr, list):
+        expr = {'and': expr}
+
+    parts = []
+    for key, value in expr.items():
+        if key in ('and', 'or'):
+            combine = and_ if key == 'and' else or_
+            parts.append(combine(*(_expression(part) for part in value)) if value
+                         else true() if key == 'and' else false())
+        elif key == 'not':
+            parts.append(not_(_expression(value)))
+        else:
+            parts.append(_facet_condition(key, value))
+    return and_(true(), *parts)
+
+
+def _simple_filters(expr):
+    """(state, district, sector) when the expression is answerable from company_counts"""
+    if not isinstance(expr, dict) or not set(expr) <= {'state', 'district', 'sector'}:
+        return None
+    if not all(isinstance(value, str) for value in expr.values()):
+        return None
+    return expr.get('state', ''), expr.get('district', ''), expr.get('sector', '')
+
+
+class SqlCompanyStore:
+
+    def __init__(self, version_ttl=VERSION_TTL):
+        self.version_ttl = version_ttl
+        self._version = (None, None)  # (monotonic time read, version)
+        self._has_fts = (None, None)  # (version, bool)
+        self._summary = (None, None)  # (version, summary)
+        self._suggest = (None, None)  # (version, SuggestIndex)
+        self._fuzzy = (None, None)  # (version, FuzzyIndex)
+        self._lock = threading.Lock()  # one rebuild at a time after an import
+
+    @property
+    def has_fts(self):
+        """Whether the FTS table exists (checked again after each import)"""
+        version = self.version
+        checked_for, found = self._has_fts
+        if found is None or checked_for != version:
+            found = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}).first() is not None
+            self._has_fts = (version, found)
+        return found
+
+    def __len__(self):
+        return self.count()
+
+    @property
+    def version(self):
+        """The latest import (see import_companies.record_import), re-read at most
+        every version_ttl seconds; user accounts live in the same database, so
+        its file changes on every login"""
+        read_at, version = self._version
+        now = time.monotonic()
+        if version is None or now - read_at >= self.version_ttl:
+            latest = CompanyImport.query.order_by(CompanyImport.id.desc()).first()
+            if latest is None:
+                version = 'sqlite'  # imported before imports were recorded
+            else:
+                version = f"import:{latest.id}:{latest.imported_at!r}"
+            self._version = (now, version)
+        return version
+
+    @property
+    def summary(self):
+        """Overall, per-state, per-district and per-sector counts (read once per import)"""
+        version = self.version
+        read_for, summary = self._summary
+        if summary is None or read_for != version:
+            # Per-district and per-sector totals; a company without a sector is only
+            # in the former, so it is counted under '' as the memory store does
+            districts, sectors = {}, Counter()
+            for c in CompanyCount.query.filter(
+                    or_(and_(CompanyCount.state != '', CompanyCount.district != '',
+                             CompanyCount.sector == ''),
+                        and_(CompanyCount.state == '', CompanyCount.district == '',
+                             CompanyCount.sector != ''))):
+                if c.state:
+                    districts[(c.state, c.district, '')] = c.companies
+                else:
+                    sectors[c.sector] = c.companies
+            summary = count_summary(districts)
+            if summary['total'] > sum(sectors.values()):
+                sectors[''] = summary['total'] - sum(sectors.values())
+            summary['sectors'] = sectors
+            self._summary = (version, summary)
+        return summary
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Most popular names, directors and districts with a word starting with the query;
+        the index is built from GROUP BY counts and rebuilt once per import"""
+        version = self.version
+        built_for, index = self._suggest
+        if index is None or built_for != version:
+            with self._lock:
+                built_for, index = self._suggest
+                if index is None or built_for != version:
+                    values = []
+                    for kind, column in (('name', Company.name), ('director', Company.director),
+                                         ('district', Company.district)):
+                        values.extend((value, kind, n) for value, n in
+                                      db.session.query(column, func.count()).group_by(column))
+                    index = SuggestIndex(values)
+                    self._suggest = (version, index)
+        return index.suggest(query, limit)
+
+    def company(self, company_id):
+        company = db.session.get(Company, company_id)
+        return company.to_dict() if company else None
+
+    def count(self, state='', district='', sector=''):
+        """Number of companies matching the filters, from the company_counts table"""
+        counted = db.session.get(CompanyCount, (state, district, sector))
+        if counted is not None:
+            return counted.companies
+        if CompanyCount.query.first() is None:
+            # Imported before counters existed
+            return self._filtered(state, district, sector).count()
+        return 0
+
+    def page(self, state='', district='', sector='', after_id=None, before_id=None, limit=20):
+        return self._page_of(self._filtered(state, district, sector), after_id, before_id, limit)
+
+    def ranks(self, query):
+        """Whether search_page pages this query by (score, id) positions"""
+        return bool(match_expression(query)) and self.has_fts
+
+    def search_count(self, query, state='', fuzzy=False):
+        match = self._match(query, fuzzy)
+        if match and self.has_fts:
+            sql = f"SELECT count(*) FROM {FTS_TABLE} f"
+            if state:
+                sql += " JOIN companies c ON c.id = f.rowid WHERE c.state = :state AND"
+            else:
+                sql += " WHERE"
+            sql += f" {FTS_TABLE} MATCH :match"
+            return db.session.execute(text(sql), {'match': match, 'state': state}).scalar()
+        return self._searched(query, state).count()
+
+    def search_page(self, query, state='', after=None, before=None, limit=20, fuzzy=False):
+        """Ranked page of matches.
+
+        Text queries are paged by (score, id) positions; a state-only search
+        is a plain listing paged by id.
+        """
+        match = self._match(query, fuzzy)
+        if match and self.has_fts:
+            return self._ranked_page(match, state, after, before, limit)
+        if isinstance(after, tuple):
+            after = after[1]
+        if isinstance(before, tuple):
+            before = before[1]
+        return self._page_of(self._searched(query, state), after, before, limit)
+
+    def search_results(self, query, state='', after=None, before=None, limit=20, fuzzy=False):
+        """search_page plus the total"""
+        companies, has_more = self.search_page(query, state, after, before, limit, fuzzy)
+        return {'companies': companies, 'has_more': has_more,
+                'total': self.search_count(query, state, fuzzy)}
+
+    def has_matches(self, query):
+        """Whether any company matches the query's words exactly"""
+        match = match_expression(query)
+        if match and self.has_fts:
+            return db.session.execute(
+                text(f"SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match LIMIT 1"),
+                {'match': match}).first() is not None
+        return self._searched(query).first() is not None
+
+    def _ranked_page(self, match, state, after, before, limit):
+        params = {'match': match, 'state': state, 'limit': limit + 1}
+        sql = (f"SELECT f.rowid AS id, {_SCORE} AS score FROM {FTS_TABLE} f"
+               + (" JOIN companies c ON c.id = f.rowid" if state else "")
+               + f" WHERE {FTS_TABLE} MATCH :match"
+               + (" AND c.state = :state" if state else ""))
+        position = before if before is not None else after
+        if position is not None and not isinstance(position, tuple):
+            raise InvalidCursor("Ranked results are paged by (score, id)")
+        if position is not None:
+            params['score'], params['id'] = position
+            compare = '<' if before is not None else '>'
+            sql = (f"SELECT id, score FROM ({sql}) WHERE score {compare} :score"
+                   f" OR (score = :score AND id {compare} :id)")
+        direction = 'DESC' if before is not None else 'ASC'
+        sql += f" ORDER BY score {direction}, id {direction} LIMIT :limit"
+
+        hits = db.session.execute(text(sql), params).all()
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        if before is not None:
+            hits.reverse()
+        if not hits:
+            return [], has_more
+
+        # Fetch full rows and snippets for this page only
+        ids = {hit.id: hit.score for hit in hits}
+        placeholders = ', '.join(str(company_id) for company_id in ids)
+        rows = db.session.execute(text(
+            f"SELECT {_FIELDS}, snippet({FTS_TABLE}, -1, :mark_start, :mark_end, '…', 12)"
+            f" AS snippet FROM {FTS_TABLE} f JOIN companies c ON c.id = f.rowid"
+            f" WHERE {FTS_TABLE} MATCH :match AND f.rowid IN ({placeholders})"),
+            {'match': match, 'mark_start': _MARK_START, 'mark_end': _MARK_END}).all()
+        by_id = {}
+        for row in rows:
+            company = {field: getattr(row, field) for field in Company.FIELDS}
+            company['score'] = ids[row.id]
+            company['snippet'] = _highlight(row.snippet)
+            by_id[row.id] = company
+        return [by_id[hit.id] for hit in hits], has_more
+
+    def facet_search(self, query='', filters=None, after=None, before=None, limit=20, fuzzy=False):
+        """Page of matches in id order, with counts for every facet value"""
+        filters = {facet: value for facet, value in (filters or {}).items() if value}
+        validate_filter(filters)
+        if isinstance(after, tuple):
+            after = after[1]
+        if isinstance(before, tuple):
+            before = before[1]
+
+        companies, has_more = self._page_of(self._facet_query(query, filters, fuzzy=fuzzy),
+                                            after, before, limit)
+        counts = {}
+        for facet in FACETS:
+            column = _facet_column(facet)
+            others = {key: value for key, value in filters.items() if key != facet}
+            rows = (self._facet_query(query, others, db.session.query(column, func.count()), fuzzy)
+                    .filter(column.isnot(None)).group_by(column).all())
+            if facet == 'established':
+                counts[facet] = {year_bucket(start): n for start, n in rows}
+            else:
+                counts[facet] = {value: n for value, n in rows if value}
+        total = self._facet_query(query, filters, fuzzy=fuzzy).count()
+        return {'companies': companies, 'has_more': has_more, 'total': total, 'facets': counts}
+
+    def filter_page(self, expr, after=None, before=None, limit=20):
+        """Page of companies matching a filter expression (see bitmap_index)"""
+        if isinstance(after, tuple):
+            after = after[1]
+        if isinstance(before, tuple):
+            before = before[1]
+        query = Company.query.filter(_condition(expr))
+        companies, has_more = self._page_of(query, after, before, limit)
+        return {'companies': companies, 'has_more': has_more, 'total': self.filter_count(expr)}
+
+    def filter_count(self, expr):
+        """Number of companies matching a filter expression, from company_counts when it can"""
+        simple = _simple_filters(expr)
+        if simple is not None:
+            return self.count(*simple)
+        return Company.query.filter(_condition(expr)).count()
+
+    def filter_id_at(self, expr, index):
+        """Id of the company at a 0-based index of filter_page's listing, or None past its end"""
+        if index < 0:
+            return None
+        return (db.session.query(Company.id).filter(_condition(expr))
+                .order_by(Company.id).offset(index).limit(1).scalar())
+
+    def _facet_query(self, text_query, filters, query=None, fuzzy=False):
+        query = query if query is not None else Company.query
+        for facet, value in filters.items():
+            query = query.filter(_facet_condition(facet, value))
+        match = self._match(text_query, fuzzy)
+        if match and self.has_fts:
+            query = query.filter(text(
+                f"companies.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match)"
+            )).params(match=match)
+        elif text_query.strip():
+            query = self._searched(text_query, query=query)
+        return query
+
+    def _match(self, query, fuzzy=False):
+        """MATCH string for a query; fuzzy ones (FTS only) accept other spellings"""
+        if not (fuzzy and self.has_fts):
+            return match_expression(query)
+        version = self.version
+        built_for, index = self._fuzzy
+        if index is None or built_for != version:
+            with self._lock:
+                built_for, index = self._fuzzy
+                if index is None or built_for != version:
+                    # Vocabulary of the searchable columns, rebuilt once per import
+                    vocabulary = set()
+                    for column in (Company.name, Company.director, Company.state,
+                                   Company.district, Company.sector):
+                        for (value,) in db.session.query(column).distinct():
+                            vocabulary.update(tokenize(value or ''))
+                    index = FuzzyIndex(sorted(vocabulary))
+                    self._fuzzy = (version, index)
+        return match_expression(query, index.similar)
+
+    def _filtered(self, state='', district='', sector=''):
+        query = Company.query
+        if state:
+            query = query.filter(Company.state == state)
+        if district:
+            query = query.filter(Company.district == district)
+        if sector:
+            query = query.filter(Company.sector == sector)
+        return query
+
+    def _searched(self, text, state='', query=None):
+        query = query if query is not None else self._filtered(state)
+        for term in text.split():
+            # % and _ in the query are literal characters, not wildcards
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f'%{escaped}%'
+            query = query.filter(or_(*(column.ilike(pattern, escape='\\')
+                                       for column in (Company.name, Company.director, Company.state,
+                                                      Company.district, Company.sector))))
+        return query
+
+    def _page_of(self, query, after_id, before_id, limit):
+        # Fetch one extra row to know whether the listing continues
+        if before_id is not None:
+            rows = (query.filter(Company.id < before_id)
+                    .order_by(Company.id.desc()).limit(limit + 1).all())
+            has_more = len(rows) > limit
+            return [c.to_dict() for c in reversed(rows[:limit])], has_more
+        if after_id is not None:
+            query = query.filter(Company.id > after_id)
+        rows = query.order_by(Company.id).limit(limit + 1).all()
+        return [c.to_dict() for c in rows[:limit]], len(rows) > limit
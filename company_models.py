@@ -0,0 +1,64 @@
+from extensions import db
+
+
+class Company(db.Model):
+    """A company imported from data/companies.json by import_companies.py"""
+    __tablename__ = 'companies'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    director = db.Column(db.String(120))
+    phone = db.Column(db.String(20))
+    email = db.Column(db.String(120))
+    website = db.Column(db.String(200))
+    # Filters compare these case-insensitively, so the indexes use NOCASE too
+    state = db.Column(db.String(60, collation='NOCASE'), nullable=False)
+    district = db.Column(db.String(60, collation='NOCASE'), nullable=False)
+    address = db.Column(db.String(300))
+    pincode = db.Column(db.String(10))
+    sector = db.Column(db.String(60, collation='NOCASE'))
+    established = db.Column(db.Integer)
+    employees = db.Column(db.String(20))
+
+    # Composite indexes ending in id serve filtered keyset pagination.
+    # The importer drops them before a bulk load and recreates them after.
+    __table_args__ = (
+        db.Index('ix_companies_state_id', 'state', 'id'),
+        db.Index('ix_companies_state_district_id', 'state', 'district', 'id'),
+        db.Index('ix_companies_district_id', 'district', 'id'),
+        db.Index('ix_companies_sector_id', 'sector', 'id'),
+    )
+
+    # Columns in the order the importer writes them
+    FIELDS = ('id', 'name', 'director', 'phone', 'email', 'website', 'state',
+              'district', 'address', 'pincode', 'sector', 'established', 'employees')
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f'<Company {self.id} {self.name}>'
+
+
+class CompanyCount(db.Model):
+    """Company totals per (state, district, sector), written by the importer.
+
+    An empty string means "any", so ('Bihar', '', '') is the Bihar total and
+    ('', '', '') the whole directory.
+    """
+    __tablename__ = 'company_counts'
+
+    state = db.Column(db.String(60, collation='NOCASE'), primary_key=True)
+    district = db.Column(db.String(60, collation='NOCASE'), primary_key=True)
+    sector = db.Column(db.String(60, collation='NOCASE'), primary_key=True)
+    companies = db.Column(db.Integer, nullable=False)
+
+
+class CompanyImport(db.Model):
+    """One row per run of the importer; the latest identifies the data being served"""
+    __tablename__ = 'company_imports'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(300))
+    companies = db.Column(db.Integer, nullable=False)
+    imported_at = db.Column(db.Float, nullable=False)
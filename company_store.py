@@ -0,0 +1,684 @@
+"""
+Company store for the Indian Business Directory.
+
+The company dataset is loaded once per process and kept as compact columns
+instead of a list of dicts:
+- text fields live in one UTF-8 heap per column with an offsets array
+- state, district, sector and employee band are interned and stored as codes
+- id and established year are plain integer arrays
+- phone numbers and pincodes are packed into integers
+
+Routes ask the store for rows and only the rows they show become dicts.
+The same columns can be saved to and memory-mapped from a binary file
+(see columnar_format), which skips the JSON parse at start-up.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from bisect import bisect_left, bisect_right
+
+from bitmap_index import Bitmap, BitmapIndex, validate_filter
+from columnar_format import (CATEGORY_COLUMNS, DIGITS_COLUMNS, INT_COLUMNS, STRING_COLUMNS,
+                             ColumnarFile)
+from search_cache import SearchCache
+from search_index import SearchIndex, tokenize
+from suggest_index import MAX_SUGGESTIONS, SuggestIndex
+
+DATA_DIR = 'data'
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class StringColumn:
+    """Strings packed into one UTF-8 heap, addressed by an offsets array"""
+
+    def __init__(self):
+        self.heap = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value):
+        self.heap += (value or '').encode('utf-8')
+        self.offsets.append(len(self.heap))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        # str() decodes bytearray slices and memoryviews of a mapped file alike
+        return str(self.heap[self.offsets[row]:self.offsets[row + 1]], 'utf-8')
+
+
+class CategoryColumn:
+    """Repeated values (state, district, sector...) stored as small integer codes"""
+
+    def __init__(self):
+        self.values = []
+        self.lookup = {}
+        self.codes = array('H')
+
+    def code_for(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self.code_for(value or ''))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+
+class DigitsColumn:
+    """Fixed-width digit strings (phone, pincode) packed into integers.
+
+    0 means "not packed": the original string (usually empty) is kept in
+    `extras` so unusual values still round-trip.
+    """
+
+    def __init__(self, prefix, width):
+        self.prefix = prefix
+        self.width = width
+        self.packed = array('Q')
+        self.extras = {}
+
+    def append(self, value):
+        value = '' if value is None else str(value)
+        digits = value[len(self.prefix):]
+        if (value.startswith(self.prefix) and len(digits) == self.width
+                and digits.isdigit()):
+            self.packed.append(int(digits) + 1)
+        else:
+            if value:
+                self.extras[len(self.packed)] = value
+            self.packed.append(0)
+
+    def __len__(self):
+        return len(self.packed)
+
+    def __getitem__(self, row):
+        packed = self.packed[row]
+        if not packed:
+            return self.extras.get(row, '')
+        return f"{self.prefix}{packed - 1:0{self.width}d}"
+
+
+class CompanyStore:
+    """All companies held column by column; row numbers follow file order"""
+
+    def __init__(self):
+        self.ids = array('I')
+        self.established = array('H')
+        self.name = StringColumn()
+        self.director = StringColumn()
+        self.email = StringColumn()
+        self.website = StringColumn()
+        self.address = StringColumn()
+        self.phone = DigitsColumn('+91 ', 10)
+        self.pincode = DigitsColumn('', 6)
+        self.state = CategoryColumn()
+        self.district = CategoryColumn()
+        self.sector = CategoryColumn()
+        self.employees = CategoryColumn()
+        self.search_index = None
+        self.bitmap_index = None
+        self.suggest_index = None
+        self._suggest_lock = threading.Lock()
+        self.rows_by_state = {}
+        self.rows_by_district = {}
+        self.rows_by_sector = {}
+        self.row_of_id = array('i')
+        self.facet_counts = {}
+        self.summary = count_summary({})
+        # ColumnarFile the columns are mapped from (None when built in memory)
+        self.source = None
+        # Identifies the loaded data (see dataset_version)
+        self.version = 'empty'
+        self.search_cache = SearchCache()
+
+    def append(self, company):
+        self.ids.append(company['id'])
+        self.established.append(company.get('established') or 0)
+        self.name.append(company.get('name'))
+        self.director.append(company.get('director'))
+        self.email.append(company.get('email'))
+        self.website.append(company.get('website'))
+        self.address.append(company.get('address'))
+        self.phone.append(company.get('phone'))
+        self.pincode.append(company.get('pincode'))
+        self.state.append(company.get('state'))
+        self.district.append(company.get('district'))
+        self.sector.append(company.get('sector'))
+        self.employees.append(company.get('employees'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def record(self, row):
+        """Build the company dict for one row"""
+        return {
+            'id': self.ids[row],
+            'name': self.name[row],
+            'director': self.director[row],
+            'phone': self.phone[row],
+            'email': self.email[row],
+            'website': self.website[row],
+            'state': self.state[row],
+            'district': self.district[row],
+            'address': self.address[row],
+            'pincode': self.pincode[row],
+            'sector': self.sector[row],
+            'established': self.established[row] or None,
+            'employees': self.employees[row],
+        }
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def row_for_id(self, company_id):
+        """Row of a company id in constant time (None if there is no such company)"""
+        if 0 <= company_id < len(self.row_of_id):
+            row = self.row_of_id[company_id]
+            if row >= 0:
+                return row
+        return None
+
+    def build_indexes(self):
+        """Dense id -> row array, row arrays keyed by lower-cased state,
+        (state, district) and sector, and the counts"""
+        # Ids from the generators are dense integers starting at 1
+        row_of_id = array('i', [-1]) * (max(self.ids, default=0) + 1)
+        for row, company_id in enumerate(self.ids):
+            row_of_id[company_id] = row
+        self.row_of_id = row_of_id
+
+        state_codes = self.state.codes
+        district_codes = self.district.codes
+        sector_codes = self.sector.codes
+        by_state = {}
+        by_district = {}
+        by_sector = {}
+        for row in range(len(self)):
+            state = state_codes[row]
+            for index, key in ((by_state, state),
+                               (by_district, (state, district_codes[row])),
+                               (by_sector, sector_codes[row])):
+                rows = index.get(key)
+                if rows is None:
+                    rows = index[key] = array('I')
+                rows.append(row)
+
+        states = self.state.values
+        districts = self.district.values
+        sectors = self.sector.values
+        self.rows_by_state = _merge_keys(by_state, lambda code: states[code].lower())
+        self.rows_by_district = _merge_keys(
+            by_district, lambda key: (states[key[0]].lower(), districts[key[1]].lower()))
+        self.rows_by_sector = _merge_keys(by_sector, lambda code: sectors[code].lower())
+        self.build_counts()
+
+    def count_triples(self):
+        """Companies per (state, district, sector), as spelt in the data"""
+        states = self.state.values
+        districts = self.district.values
+        sectors = self.sector.values
+        triples = Counter(zip(self.state.codes, self.district.codes, self.sector.codes))
+        return {(states[s], districts[d], sectors[c]): n for (s, d, c), n in triples.items()}
+
+    def build_counts(self, triples=None):
+        """Counts behind count() and summary, from count_triples() unless given"""
+        if triples is None:
+            triples = self.count_triples()
+        lowered = Counter()
+        for key, n in triples.items():
+            lowered[tuple(value.lower() for value in key)] += n
+        self.facet_counts = count_projections(lowered)
+        self.summary = count_summary(triples)
+
+    def filter_rows(self, state='', district='', sector=''):
+        """Rows matching the given filters (case-insensitive), in row order"""
+        state = state.lower()
+        district = district.lower()
+        candidates = []
+        if state and district:
+            candidates.append(self.rows_by_district.get((state, district), array('I')))
+        elif state:
+            candidates.append(self.rows_by_state.get(state, array('I')))
+        elif district:
+            candidates.append(_merge_rows(rows for (_, name), rows in self.rows_by_district.items()
+                                          if name == district))
+        if sector:
+            candidates.append(self.rows_by_sector.get(sector.lower(), array('I')))
+
+        if not candidates:
+            return range(len(self))
+        if len(candidates) == 1:
+            return candidates[0]
+        smaller, larger = sorted(candidates, key=len)
+        larger = set(larger)
+        return array('I', (row for row in smaller if row in larger))
+
+    def search_rows(self, query, state='', fuzzy=False):
+        """Rows of companies matching every word of the query, optionally within a state;
+        fuzzy also accepts other spellings of each word (see fuzzy_index).
+
+        Results are cached; a query extending a cached exact one narrows its
+        rows instead of searching again (see search_cache).
+        """
+        if self.search_index is None:
+            self.search_index = SearchIndex(self)
+
+        terms = tokenize(query)
+        if not terms:
+            return self.filter_rows(state=state) if state else array('I')
+
+        state = state.lower()
+        rows, start = self.search_cache.lookup(terms, state, fuzzy)
+        if rows is not None and start is None:
+            return rows
+        if rows is not None:
+            rows = self.search_index.refine(rows, terms, start)
+        else:
+            rows = self._search_rows(query, state, fuzzy)
+        self.search_cache.put(terms, state, rows, fuzzy)
+        return rows
+
+    def has_matches(self, query):
+        """Whether any company matches the query's words exactly"""
+        return len(self.search_rows(query)) > 0
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Most popular names, directors and districts with a word starting with the query"""
+        if self.suggest_index is None:
+            with self._suggest_lock:
+                # Concurrent first requests wait for one build
+                if self.suggest_index is None:
+                    started = time.perf_counter()
+                    self.suggest_index = SuggestIndex(self.suggest_values())
+                    logger.info("Built suggestion index (%d words) in %.1fs",
+                                len(self.suggest_index), time.perf_counter() - started)
+        return self.suggest_index.suggest(query, limit)
+
+    def suggest_values(self):
+        """(text, kind, companies) for every distinct name, director and district"""
+        rows = range(len(self))
+        for kind, column in (('name', self.name), ('director', self.director)):
+            for text, n in Counter(column[row] for row in rows).items():
+                yield text, kind, n
+        districts = self.district.values
+        for code, n in Counter(self.district.codes).items():
+            yield districts[code], 'district', n
+
+    def _search_rows(self, query, state, fuzzy=False):
+        rows = (self.search_index.fuzzy_search if fuzzy else self.search_index.search)(query)
+        if not state:
+            return rows
+        state_rows = self.filter_rows(state=state)
+        if len(rows) > len(state_rows):
+            rows, state_rows = state_rows, rows
+        state_rows = set(state_rows)
+        return array('I', (row for row in rows if row in state_rows))
+
+    # The methods below are what routes use; company_db.SqlCompanyStore
+    # provides the same ones on top of SQLite.
+
+    def company(self, company_id):
+        row = self.row_for_id(company_id)
+        return self.record(row) if row is not None else None
+
+    def count(self, state='', district='', sector=''):
+        """Number of companies matching the filters, from precomputed counters"""
+        return self.facet_counts.get((state.lower(), district.lower(), sector.lower()), 0)
+
+    def page(self, state='', district='', sector='', after_id=None, before_id=None, limit=20):
+        """One page of filtered companies after (or before) a company id.
+
+        Returns (companies, has_more) where has_more tells whether the
+        listing continues in the direction being paged.
+        """
+        return self._page_of(self.filter_rows(state, district, sector), after_id, before_id, limit)
+
+    def ranks(self, query):
+        """Whether search_page pages this query by (score, id); never, results are in id order"""
+        return False
+
+    def search_count(self, query, state='', fuzzy=False):
+        return len(self.search_rows(query, state, fuzzy))
+
+    def search_page(self, query, state='', after=None, before=None, limit=20, fuzzy=False):
+        """Page of matches in id order; after/before are company ids"""
+        # Positions from a ranked (score, id) listing carry the id last
+        if isinstance(after, tuple):
+            after = after[1]
+        if isinstance(before, tuple):
+            before = before[1]
+        return self._page_of(self.search_rows(query, state, fuzzy), after, before, limit)
+
+    def search_results(self, query, state='', after=None, before=None, limit=20, fuzzy=False):
+        """search_page plus the total, both from one search"""
+        rows = self.search_rows(query, state, fuzzy)
+        companies, has_more = self._page_of(rows, after, before, limit)
+        return {'companies': companies, 'has_more': has_more, 'total': len(rows)}
+
+    def facet_search(self, query='', filters=None, after=None, before=None, limit=20, fuzzy=False):
+        """Page of matches in id order, with counts for every facet value.
+
+        filters maps facet names (state, district, sector, employees,
+        established) to values.
+        """
+        if self.search_index is None:
+            self.search_index = SearchIndex(self)
+        filters = {facet: value for facet, value in (filters or {}).items() if value}
+        validate_filter(filters)
+        index = self._bitmaps()
+
+        rows = self.search_rows(query, fuzzy=fuzzy) if tokenize(query) else None
+        base = index.universe if rows is None else Bitmap.from_rows(rows)
+        result = self._bitmap_page(base & index.filter_bitmap(filters), after, before, limit)
+        result['facets'] = index.facet_counts(base, filters)
+        return result
+
+    def filter_page(self, expr, after=None, before=None, limit=20):
+        """Page of companies matching a filter expression (see bitmap_index)"""
+        return self._bitmap_page(self._bitmaps().evaluate(expr), after, before, limit)
+
+    def filter_count(self, expr):
+        """Number of companies matching a filter expression"""
+        return len(self._bitmaps().evaluate(expr))
+
+    def filter_id_at(self, expr, index):
+        """Id of the company at a 0-based index of filter_page's listing, or None past its end"""
+        row = self._bitmaps().evaluate(expr).row_at(index)
+        return self.ids[row] if row is not None else None
+
+    def _bitmaps(self):
+        if self.bitmap_index is None:
+            self.bitmap_index = BitmapIndex(self)
+        return self.bitmap_index
+
+    def _bitmap_page(self, matched, after, before, limit):
+        if isinstance(after, tuple):
+            after = after[1]
+        if isinstance(before, tuple):
+            before = before[1]
+        if before is not None:
+            page_rows, has_more = matched.rows_before(self._position(before), limit)
+        else:
+            after_row = self._last_row_upto(after) if after is not None else -1
+            page_rows, has_more = matched.rows_after(after_row, limit)
+        return {'companies': self.records(page_rows), 'has_more': has_more, 'total': len(matched)}
+
+    def _position(self, company_id):
+        """Row where a company id sits (or would sit); rows follow id order"""
+        row = self.row_for_id(company_id)
+        return row if row is not None else bisect_left(self.ids, company_id)
+
+    def _last_row_upto(self, company_id):
+        """Row of the company id, or of the last company before it when the id is absent"""
+        row = self.row_for_id(company_id)
+        return row if row is not None else bisect_left(self.ids, company_id) - 1
+
+    def _page_of(self, rows, after_id, before_id, limit):
+        # rows are sorted, so the page boundary is found by binary search
+        if before_id is not None:
+            end = bisect_left(rows, self._position(before_id))
+            start = max(0, end - limit)
+            return self.records(rows[start:end]), start > 0
+        start = 0
+        if after_id is not None:
+            start = bisect_right(rows, self._last_row_upto(after_id))
+        end = start + limit
+        return self.records(rows[start:end]), end < len(rows)
+
+    @classmethod
+    def from_json(cls, path):
+        store = cls()
+        for company in iter_companies(path):
+            store.append(company)
+        store.build_indexes()
+        return store
+
+    @classmethod
+    def from_columnar(cls, path):
+        """Store whose columns are read-only views of a memory-mapped columnar file.
+
+        Indexes saved in the file are mapped too, and only the missing ones are
+        built, so worker processes share almost everything through the page
+        cache; facet bitmaps are decoded per process as they are first used.
+        """
+        data = ColumnarFile(path)
+        columns = data.columns
+        store = cls()
+        store.source = data
+        for name in INT_COLUMNS:
+            setattr(store, name, data.section(columns[name]['values']))
+        for name in STRING_COLUMNS:
+            column = getattr(store, name)
+            column.heap = data.section(columns[name]['heap'])
+            column.offsets = data.section(columns[name]['offsets'])
+        for name in DIGITS_COLUMNS:
+            column = getattr(store, name)
+            if (columns[name]['prefix'], columns[name]['width']) != (column.prefix, column.width):
+                raise ValueError(f"{path}: unexpected {name} packing")
+            column.packed = data.section(columns[name]['packed'])
+            column.extras = {int(row): value for row, value in columns[name]['extras'].items()}
+        for name in CATEGORY_COLUMNS:
+            column = getattr(store, name)
+            column.values = [sys.intern(value) for value in columns[name]['values']]
+            column.lookup = {value: code for code, value in enumerate(column.values)}
+            column.codes = data.section(columns[name]['codes'])
+
+        indexes = data.indexes
+        if 'row_of_id' in indexes:
+            store.row_of_id = data.section(indexes['row_of_id'])
+            store.rows_by_state = data.grouped('rows_by_state')
+            store.rows_by_district = data.grouped('rows_by_district')
+            store.rows_by_sector = data.grouped('rows_by_sector')
+            store.build_counts(data.counts())
+        else:
+            store.build_indexes()
+        if 'postings' in indexes:
+            store.search_index = SearchIndex.from_postings(data.postings())
+        if 'bitmaps' in indexes:
+            store.bitmap_index = BitmapIndex.from_bitmaps(len(store), *data.bitmaps())
+        return store
+
+
+def count_projections(triples):
+    """Expand {(state, district, sector): count} to every combination of filters.
+
+    '' stands for "any", so the count for any filter combination is a
+    single lookup.
+    """
+    counts = Counter()
+    for (state, district, sector), n in triples.items():
+        for key in {(state, district, sector), (state, district, ''), (state, '', sector),
+                    (state, '', ''), ('', district, sector), ('', district, ''),
+                    ('', '', sector), ('', '', '')}:
+            counts[key] += n
+    return dict(counts)
+
+
+def count_summary(triples):
+    """Counts shown on pages: overall, per state, per district and per sector"""
+    summary = {'total': 0, 'states': Counter(), 'districts': {}, 'sectors': Counter()}
+    for (state, district, sector), n in triples.items():
+        summary['total'] += n
+        summary['states'][state] += n
+        summary['sectors'][sector] += n
+        districts = summary['districts'].setdefault(state, Counter())
+        districts[district] += n
+    return summary
+
+
+def _merge_rows(row_lists):
+    row_lists = list(row_lists)
+    if len(row_lists) == 1:
+        return row_lists[0]
+    return array('I', sorted(row for rows in row_lists for row in rows))
+
+
+def _merge_keys(index, normalise):
+    """Re-key an index by normalised keys, merging rows of keys that collide"""
+    grouped = {}
+    for key, rows in index.items():
+        grouped.setdefault(normalise(key), []).append(rows)
+    return {key: _merge_rows(row_lists) for key, row_lists in grouped.items()}
+
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """Yield the objects of a top-level JSON array without loading it whole"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The next object runs past the buffer: read another chunk
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield obj
+
+
+def iter_ndjson(path):
+    """Yield the objects of a newline-delimited JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_companies(path):
+    """Companies from a .ndjson file or a JSON array file"""
+    if path.endswith('.ndjson'):
+        return iter_ndjson(path)
+    return iter_json_array(path)
+
+
+def companies_path(data_dir):
+    """The dataset file to load from data_dir.
+
+    The newer of companies.ndjson and companies.json (NDJSON on a tie), as
+    directory_worker.js picks for the static site; companies.col instead
+    when it is at least as new as that file.
+    """
+    candidates = [os.path.join(data_dir, name) for name in ('companies.ndjson', 'companies.json')]
+    existing = [path for path in candidates if os.path.exists(path)]
+    path = max(existing, key=os.path.getmtime) if existing else candidates[1]
+    columnar_path = os.path.join(data_dir, 'companies.col')
+    if os.path.exists(columnar_path) and (
+            not os.path.exists(path) or os.path.getmtime(columnar_path) >= os.path.getmtime(path)):
+        return columnar_path
+    return path
+
+
+# Process-wide store, built once by init_store() at app start
+_store = None
+_states = None
+_data_dir = DATA_DIR
+
+
+def init_store(data_dir=DATA_DIR, store=None):
+    """Set up the process-wide store.
+
+    When no store is given the companies are loaded from data_dir into memory.
+    """
+    global _store, _states, _data_dir
+    _data_dir = data_dir
+    _states = None
+    if store is not None:
+        _store = store
+        return _store
+
+    path = companies_path(data_dir)
+    started = time.perf_counter()
+    if path.endswith('.col'):
+        _store = CompanyStore.from_columnar(path)
+    elif os.path.exists(path):
+        _store = CompanyStore.from_json(path)
+    else:
+        logger.warning("Company data not found at %s, starting with an empty directory", path)
+        _store = CompanyStore()
+    if os.path.exists(path):
+        stat = os.stat(path)
+        _store.version = f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    logger.info("Loaded %d companies in %.1fs", len(_store), time.perf_counter() - started)
+
+    # A columnar file usually carries both indexes already
+    if _store.search_index is None:
+        started = time.perf_counter()
+        _store.search_index = SearchIndex(_store)
+        logger.info("Built search index (%d tokens) in %.1fs",
+                    len(_store.search_index.vocabulary), time.perf_counter() - started)
+
+    if _store.bitmap_index is None:
+        started = time.perf_counter()
+        _store.bitmap_index = BitmapIndex(_store)
+        logger.info("Built facet bitmaps in %.1fs", time.perf_counter() - started)
+    return _store
+
+
+def get_store():
+    if _store is None:
+        init_store(_data_dir)
+    return _store
+
+
+def dataset_version():
+    """String that changes whenever the company data behind the store changes"""
+    return get_store().version
+
+
+def load_states_data():
+    """States and their districts (read once)"""
+    global _states
+    if _states is None:
+        path = os.path.join(_data_dir, 'states.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _states = json.load(f)
+        except FileNotFoundError:
+            logger.warning("States data not found at %s", path)
+            _states = []
+    return _states
+
+
+def get_company_by_id(company_id):
+    return get_store().company(company_id)
+
+
+def search_companies(query, state='', limit=20):
+    """Companies whose name, director, state, district or sector match the query,
+    or match it with other spellings of its words when nothing matches exactly"""
+    store = get_store()
+    fuzzy = bool(tokenize(query)) and not store.has_matches(query)
+    companies, _ = store.search_page(query, state, limit=limit, fuzzy=fuzzy)
+    return companies
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Precompressed, content-hashed copies of the data files the browser fetches.
+
+For every .json, .ndjson and .bin file under data/ (the dataset, states,
+shard files and search index) compress_assets() writes:
+- <file>.gz (gzip level 9) and, when the optional brotli package is
+  installed, <file>.br
+- an entry in data/assets.json with the file's SHA-256 content hash, its
+  size and modification time, and the size of each compressed copy
+
+The app serves these through /data/<path> (see send_data_asset): the
+smallest copy the client accepts with a matching Content-Encoding, the
+content hash as ETag so a repeat visit is answered with 304 Not Modified,
+and Range requests for partial downloads. A file changed after compression
+no longer matches its entry and is served uncompressed until rerun.
+
+    python data_assets.py [data]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_EXTENSIONS = ('.json', '.ndjson', '.bin')
+MIMETYPES = {'.json': 'application/json', '.ndjson': 'application/x-ndjson',
+             '.bin': 'application/octet-stream'}
+MANIFEST_NAME = 'assets.json'
+
+# Preferred first; brotli is only used when the package is installed
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Quality 11 takes minutes per 100 MB; 9 is within a few percent of its size
+BROTLI_QUALITY = 9
+
+CHUNK_SIZE = 1 << 20
+
+_manifests = {}  # data_dir -> (manifest mtime, manifest)
+
+
+def iter_assets(data_dir):
+    """Paths of the servable data files, relative to data_dir with '/' separators"""
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name == MANIFEST_NAME or not name.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.relpath(os.path.join(root, name), data_dir)
+            yield path.replace(os.sep, '/')
+
+
+def file_hash(path):
+    """Hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress_file(path, target, encoding):
+    """Write a compressed copy of path, replacing target only once complete"""
+    partial = target + '.tmp'
+    with open(path, 'rb') as src, open(partial, 'wb') as dst:
+        if encoding == 'gzip':
+            # mtime=0 so the same input always gives the same bytes
+            with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=9, mtime=0) as out:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+        else:
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(compressor.process(chunk))
+            dst.write(compressor.finish())
+    os.replace(partial, target)
+
+
+def _link_or_copy(source, target):
+    if os.path.exists(target):
+        if os.path.samefile(source, target):
+            return
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _read_manifest(data_dir):
+    try:
+        with open(os.path.join(data_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def compress_assets(data_dir='data'):
+    """Write the compressed copies and data/assets.json; returns the manifest.
+
+    Files whose content hash is unchanged since the last run keep their
+    existing compressed copies.
+    """
+    previous = _read_manifest(data_dir)
+    manifest = {}
+    seen = {}  # (device, inode) -> path, for hard links such as companies.json
+    for name in iter_assets(data_dir):
+        path = os.path.join(data_dir, name)
+        stat = os.stat(path)
+        original = seen.setdefault((stat.st_dev, stat.st_ino), path)
+        if original != path:
+            # Same file under another name: link to the copies made for it
+            entry = dict(manifest[os.path.relpath(original, data_dir).replace(os.sep, '/')])
+            for encoding, suffix in ENCODINGS:
+                if encoding in entry:
+                    _link_or_copy(original + suffix, path + suffix)
+            manifest[name] = entry
+            continue
+
+        entry = {'etag': file_hash(path), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        old = previous.get(name, {})
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            target = path + suffix
+            if old.get('etag') != entry['etag'] or encoding not in old or not os.path.exists(target):
+                _compress_file(path, target, encoding)
+            entry[encoding] = os.path.getsize(target)
+        manifest[name] = entry
+
+    with open(os.path.join(data_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def asset_manifest(data_dir):
+    """data/assets.json, re-read whenever the file changes"""
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _manifests.get(data_dir)
+    if cached is None or cached[0] != mtime:
+        cached = _manifests[data_dir] = (mtime, _read_manifest(data_dir))
+    return cached[1]
+
+
+def send_data_asset(data_dir, filename):
+    """Flask response for a data file, precompressed and content-hash ETagged when possible"""
+    from flask import abort, request, send_file
+    from werkzeug.security import safe_join
+
+    extension = os.path.splitext(filename)[1]
+    path = safe_join(data_dir, filename)
+    if extension not in ASSET_EXTENSIONS or path is None or not os.path.isfile(path):
+        abort(404)
+
+    # The entry only applies while the file is exactly as it was compressed
+    entry = asset_manifest(data_dir).get(filename)
+    stat = os.stat(path)
+    if entry and (entry['size'], entry['mtime']) != (stat.st_size, stat.st_mtime_ns):
+        entry = None
+
+    encoding = None
+    if entry:
+        encoding, suffix = next(
+            ((encoding, suffix) for encoding, suffix in ENCODINGS
+             if encoding in entry and request.accept_encodings[encoding]
+             and os.path.exists(path + suffix)),
+            (None, ''))
+        path += suffix
+        # Each encoding is a different byte sequence, so it needs its own ETag
+        etag = f"{entry['etag'][:32]}-{encoding}" if encoding else entry['etag'][:32]
+    else:
+        etag = True  # werkzeug's default, from mtime and size
+
+    # Last-Modified is the original's, not the compressed copy's (see company_store.companies_path)
+    response = send_file(path, mimetype=MIMETYPES[extension], conditional=True, etag=etag,
+                         last_modified=stat.st_mtime)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress the data files and record their hashes")
+    parser.add_argument('data_dir', nargs='?', default='data')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = compress_assets(args.data_dir)
+    if brotli is None:
+        print("brotli is not installed, writing gzip copies only (pip install brotli)")
+    size = sum(entry['size'] for entry in manifest.values())
+    gzip_size = sum(entry['gzip'] for entry in manifest.values())
+    print(f"Compressed {len(manifest)} files in {args.data_dir} in {time.perf_counter() - started:.1f}s")
+    print(f"  original: {size / (1024 * 1024):.1f} MB")
+    print(f"  gzip:     {gzip_size / (1024 * 1024):.1f} MB ({size / max(gzip_size, 1):.1f}x smaller)")
+    if brotli is not None:
+        br_size = sum(entry['br'] for entry in manifest.values())
+        print(f"  brotli:   {br_size / (1024 * 1024):.1f} MB ({size / max(br_size, 1):.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+// Web Worker for simple_index.html: loads the company data, searches it and
+// cuts result pages, so the page itself never blocks on the large dataset.
+//
+// Messages from the page:
+//   { type: 'load' }
+//   { type: 'search', id, query, state, district, perPage }
+//   { type: 'page', id, page }
+// Messages to the page:
+//   { type: 'ready', total, done }       data can be searched (total companies so far)
+//   { type: 'loaded', total, done }      more companies arrived while streaming NDJSON
+//   { type: 'failed' }                   no data could be loaded
+//   { type: 'progress', id, message }    a long search is still running
+//   { type: 'page', id, page, total, isAll, ids, companies }
+//   { type: 'error', id, message }
+// `ids` is a Uint32Array of the page's company ids, transferred rather than copied.
+
+let companiesData = [];        // whole dataset, only used when there are no shard files
+let manifest = null;           // data/shards/manifest.json: shard files and their counts
+let allShards = [];            // every (state, district) shard in manifest order
+const shardCache = new Map();  // shard file -> promise of its companies, oldest first
+const searchFiles = new Map(); // first character -> promise of that search index file
+const MAX_CACHED_SHARDS = 12;  // keeps memory small on the million-row dataset
+let currentView = null;        // listing being paged: { total, isAll, slice(start, end) }
+let perPage = 20;
+let latestSearch = 0;
+let readySent = false;
+let lastReport = 0;            // time of the last 'loaded' message
+const LOADED_INTERVAL = 500;   // ms between 'loaded' messages while NDJSON streams in
+
+self.onmessage = function(event) {
+    const message = event.data;
+    if (message.type === 'load') {
+        loadCompaniesData();
+    } else if (message.type === 'search') {
+        latestSearch = message.id;
+        perPage = message.perPage || perPage;
+        runSearch(message);
+    } else if (message.type === 'page') {
+        sendPage(message.id, message.page);
+    }
+};
+
+// Load the shard manifest only; shards are fetched when a page needs them
+async function loadCompaniesData() {
+    try {
+        const response = await fetch('data/shards/manifest.json');
+        if (!response.ok) throw new Error('No shard manifest');
+        manifest = await response.json();
+        let start = 0;
+        manifest.states.forEach(state => {
+            state.districts.forEach(district => {
+                district.state = state.name;
+                district.start = start;  // number of its first company, as used by the search index
+                start += district.count;
+                allShards.push(district);
+            });
+        });
+        currentView = shardView(allShards, true);
+        self.postMessage({ type: 'ready', total: manifest.total, done: true });
+    } catch (error) {
+        await loadFullDataset();
+    }
+}
+
+// Load the single dataset file (datasets built without shards). NDJSON is
+// parsed line by line as it downloads, so the first page shows long before
+// the whole file has arrived; a JSON array can only be parsed once complete.
+async function loadFullDataset() {
+    self.postMessage({ type: 'progress', message: '📊 Loading 1.1+ Million Companies... this may take a moment' });
+    currentView = arrayView(companiesData, true);
+    try {
+        if (await datasetUrl() !== 'data/companies.ndjson' || !await streamNdjson('data/companies.ndjson')) {
+            const response = await fetch('data/companies.json');
+            if (!response.ok) throw new Error('Network response was not ok');
+            companiesData = await response.json();
+            currentView = arrayView(companiesData, true);
+            reportLoaded(true);
+        }
+    } catch (error) {
+        if (!companiesData.length) {
+            self.postMessage({ type: 'failed' });
+            return;
+        }
+        reportLoaded(true);  // keep whatever arrived before the failure
+    }
+}
+
+// The newer of the two dataset files (NDJSON on a tie), the same choice as
+// company_store.companies_path makes for the app
+async function datasetUrl() {
+    const urls = ['data/companies.ndjson', 'data/companies.json'];
+    const modified = await Promise.all(urls.map(url => fetch(url, { method: 'HEAD' })
+        .then(response => response.ok ? Date.parse(response.headers.get('Last-Modified')) || 0 : -1)
+        .catch(() => -1)));
+    return modified[1] > modified[0] ? urls[1] : urls[0];
+}
+
+// Append the companies of an NDJSON file as each chunk arrives; false if there is no such file
+async function streamNdjson(url) {
+    const response = await fetch(url);
+    if (!response.ok || !response.body) return false;
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let partial = '';
+    for (;;) {
+        const { done, value } = await reader.read();
+        const lines = (partial + decoder.decode(value, { stream: !done })).split('\n');
+        partial = done ? '' : lines.pop();  // an unfinished last line waits for the next chunk
+        for (const line of lines) {
+            if (line.trim()) companiesData.push(JSON.parse(line));
+        }
+        reportLoaded(done);
+        if (done) return true;
+    }
+}
+
+// Tell the page how many companies have loaded: 'ready' once the first arrive,
+// then 'loaded' updates at most every LOADED_INTERVAL ms and when complete
+function reportLoaded(done) {
+    if (!readySent) {
+        if (!companiesData.length && !done) return;
+        readySent = true;
+        self.postMessage({ type: 'ready', total: companiesData.length, done });
+        if (done) return;
+    }
+    const now = Date.now();
+    if (done || now - lastReport >= LOADED_INTERVAL) {
+        lastReport = now;
+        self.postMessage({ type: 'loaded', total: companiesData.length, done });
+    }
+}
+
+async function runSearch(message) {
+    const { id, query, state, district } = message;
+    try {
+        const view = manifest
+            ? await searchShards(query, state, district, id)
+            : !query && !state && !district
+            ? arrayView(companiesData, true)
+            : arrayView(companiesData.filter(company => {
+                // Fast state filter first (most selective)
+                if (state && company.state !== state) return false;
+                if (district && company.district !== district) return false;
+                // Text search last (most expensive)
+                return !query || matchesQuery(company, query);
+            }), false);
+        if (id !== latestSearch || !view) return;  // a newer search has started
+        currentView = view;
+        await sendPage(id, 1);
+    } catch (error) {
+        self.postMessage({ type: 'error', id, message: error.message });
+    }
+}
+
+// Post one page of the current listing; the id array is transferred
+async function sendPage(id, page) {
+    const view = currentView;
+    try {
+        const companies = await view.slice((page - 1) * perPage, page * perPage);
+        const ids = Uint32Array.from(companies, company => company.id || 0);
+        self.postMessage({ type: 'page', id, page, total: view.total, isAll: view.isAll,
+                           fuzzy: Boolean(view.fuzzy), ids, companies },
+                         [ids.buffer]);
+    } catch (error) {
+        self.postMessage({ type: 'error', id, message: error.message });
+    }
+}
+
+// Fetch one shard (or reuse it from the cache) as a list of company objects
+function loadShard(shard) {
+    let promise = shardCache.get(shard.file);
+    if (promise) {
+        shardCache.delete(shard.file);  // re-inserted below as most recently used
+    } else {
+        promise = fetch(`data/shards/${shard.file}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`Could not load ${shard.file}`);
+                return response.json();
+            })
+            .then(shardCompanies);
+        promise.catch(() => shardCache.delete(shard.file));
+    }
+    shardCache.set(shard.file, promise);
+    if (shardCache.size > MAX_CACHED_SHARDS) {
+        shardCache.delete(shardCache.keys().next().value);
+    }
+    return promise;
+}
+
+// Shard rows are arrays in data.fields order; state and district come from the shard
+function shardCompanies(data) {
+    return data.rows.map(row => {
+        const company = { state: data.state, district: data.district };
+        data.fields.forEach((field, i) => {
+            company[field] = row[i];
+        });
+        return company;
+    });
+}
+
+// Listing over whole shards: a page only fetches the shards it overlaps
+function shardView(shards, isAll) {
+    const starts = [];
+    let total = 0;
+    shards.forEach(shard => {
+        starts.push(total);
+        total += shard.count;
+    });
+    return {
+        total: total,
+        isAll: isAll,
+        async slice(start, end) {
+            const overlapping = shards
+                .map((shard, i) => i)
+                .filter(i => starts[i] < end && starts[i] + shards[i].count > start);
+            // Fetch the shards together, then keep their rows in listing order
+            const loaded = await Promise.all(overlapping.map(i => loadShard(shards[i])));
+            const companies = [];
+            overlapping.forEach((i, n) => {
+                companies.push(...loaded[n].slice(Math.max(start - starts[i], 0), end - starts[i]));
+            });
+            return companies;
+        }
+    };
+}
+
+// Listing over search results, given as company numbers in manifest order
+function ordinalView(ordinals) {
+    return {
+        total: ordinals.length,
+        isAll: false,
+        async slice(start, end) {
+            const page = Array.from(ordinals.subarray(start, end));
+            const pageShards = page.map(shardAt);
+            // Each distinct shard of the page is fetched once, all of them at the same time
+            const distinct = [...new Set(pageShards)];
+            const loaded = new Map(await Promise.all(
+                distinct.map(async shard => [shard, await loadShard(shard)])));
+            return page.map((ordinal, i) => loaded.get(pageShards[i])[ordinal - pageShards[i].start]);
+        }
+    };
+}
+
+// Shard holding a company number (binary search over shard starts)
+function shardAt(ordinal) {
+    let low = 0;
+    let high = allShards.length - 1;
+    while (low < high) {
+        const middle = (low + high + 1) >> 1;
+        if (allShards[middle].start <= ordinal) low = middle;
+        else high = middle - 1;
+    }
+    return allShards[low];
+}
+
+// Listing over companies already in memory (which may still be growing)
+function arrayView(companies, isAll) {
+    return {
+        get total() {
+            return companies.length;
+        },
+        isAll: isAll,
+        async slice(start, end) {
+            return companies.slice(start, end);
+        }
+    };
+}
+
+function tokenize(text) {
+    return text.toLowerCase().match(/[a-z0-9]+/g) || [];
+}
+
+// Fetch the search index file for words starting with a character
+function loadSearchFile(char) {
+    if (!searchFiles.has(char)) {
+        const file = manifest.search.files[char];
+        const promise = !file ? Promise.resolve(null) : fetch(`data/shards/${file}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`Could not load ${file}`);
+                return response.arrayBuffer();
+            })
+            .then(buffer => {
+                const headerLength = new DataView(buffer).getUint32(0, true);
+                const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+                return { tokens: header.tokens, postings: new Uint8Array(buffer, 4 + headerLength) };
+            });
+        promise.catch(() => searchFiles.delete(char));
+        searchFiles.set(char, promise);
+    }
+    return searchFiles.get(char);
+}
+
+// Company numbers of one token: varint-encoded gaps between them
+function decodePostings(bytes, start, length, count) {
+    const ordinals = new Uint32Array(count);
+    let value = 0;
+    let shift = 0;
+    let previous = 0;
+    let n = 0;
+    for (let i = start; i < start + length; i++) {
+        const byte = bytes[i];
+        value |= (byte & 0x7f) << shift;
+        if (byte & 0x80) {
+            shift += 7;
+        } else {
+            previous += value;
+            ordinals[n++] = previous;
+            value = 0;
+            shift = 0;
+        }
+    }
+    return ordinals;
+}
+
+// Companies containing a word (or, for prefix, any word starting with it);
+// fuzzy also takes the words spelt like it
+async function termOrdinals(term, prefix, fuzzy) {
+    const file = await loadSearchFile(term[0]);
+    if (!file) return new Uint32Array(0);
+    const tokens = file.tokens;
+    // First token >= term; tokens are sorted
+    let low = 0;
+    let high = tokens.length;
+    while (low < high) {
+        const middle = (low + high) >> 1;
+        if (tokens[middle][0] < term) low = middle + 1;
+        else high = middle;
+    }
+    const entries = [];
+    for (let i = low; i < tokens.length; i++) {
+        if (prefix ? !tokens[i][0].startsWith(term) : tokens[i][0] !== term) break;
+        entries.push(tokens[i]);
+    }
+    if (fuzzy) {
+        similarTokens(file, term).forEach(entry => {
+            if (!entries.includes(entry)) entries.push(entry);
+        });
+    }
+    const lists = entries.map(([, start, length, count]) => decodePostings(file.postings, start, length, count));
+    if (lists.length <= 1) return lists[0] || new Uint32Array(0);
+
+    // Union of several words' lists: concatenate, sort, drop repeats
+    const merged = new Uint32Array(lists.reduce((size, list) => size + list.length, 0));
+    let offset = 0;
+    lists.forEach(list => {
+        merged.set(list, offset);
+        offset += list.length;
+    });
+    merged.sort();
+    let n = 0;
+    for (let i = 0; i < merged.length; i++) {
+        if (i === 0 || merged[i] !== merged[n - 1]) merged[n++] = merged[i];
+    }
+    return merged.subarray(0, n);
+}
+
+// Spelling-tolerant matching, as in fuzzy_index.py: words are compared by the
+// trigrams of their phonetic keys (Shree/Sri, Agarwal/Aggarwal share a key)
+const PHONETIC_RULES = [
+    ['shr', 'sr'], ['ee', 'i'], ['oo', 'u'], ['ph', 'f'], ['ck', 'k'], ['q', 'k'],
+    ['w', 'v'], ['z', 'j'], ['bh', 'b'], ['dh', 'd'], ['gh', 'g'], ['kh', 'k'], ['th', 't'],
+];
+const SIMILARITY = 0.35;
+const MAX_EXPANSIONS = 10;
+const MIN_LENGTH = 3;
+
+function phoneticKey(token) {
+    PHONETIC_RULES.forEach(([from, to]) => { token = token.split(from).join(to); });
+    return token.replace(/([a-z])\1+/g, '$1');
+}
+
+function trigrams(key) {
+    const padded = `  ${key} `;
+    const grams = new Set();
+    for (let i = 0; i < padded.length - 2; i++) grams.add(padded.slice(i, i + 3));
+    return grams;
+}
+
+// Entries of a search file's words spelt like term, most similar first. Only the
+// term's own file is compared, so a typo in the first letter is not corrected
+function similarTokens(file, term) {
+    if (term.length < MIN_LENGTH || /^[0-9]+$/.test(term)) return [];
+    if (!file.trigrams) {
+        file.trigrams = file.tokens.map(([token]) => trigrams(phoneticKey(token)));
+    }
+    const grams = trigrams(phoneticKey(term));
+    const scored = [];
+    file.trigrams.forEach((other, i) => {
+        let shared = 0;
+        grams.forEach(gram => { if (other.has(gram)) shared++; });
+        const score = shared / (grams.size + other.size - shared);
+        if (score >= SIMILARITY) scored.push([score, file.tokens[i]]);
+    });
+    scored.sort((a, b) => b[0] - a[0]);
+    return scored.slice(0, MAX_EXPANSIONS).map(([, entry]) => entry);
+}
+
+// Sorted company numbers matching every word; the last word may be unfinished
+async function searchOrdinals(query, fuzzy) {
+    const terms = tokenize(query);
+    const lists = await Promise.all(terms.map((term, i) => termOrdinals(term, i === terms.length - 1, fuzzy)));
+    lists.sort((a, b) => a.length - b.length);
+    let result = lists[0];
+    for (const list of lists.slice(1)) {
+        result = intersectSorted(result, list);
+        if (result.length === 0) break;
+    }
+    return result;
+}
+
+function intersectSorted(a, b) {
+    const result = new Uint32Array(Math.min(a.length, b.length));
+    let i = 0;
+    let j = 0;
+    let n = 0;
+    while (i < a.length && j < b.length) {
+        if (a[i] < b[j]) i++;
+        else if (a[i] > b[j]) j++;
+        else {
+            result[n++] = a[i];
+            i++;
+            j++;
+        }
+    }
+    return result.subarray(0, n);
+}
+
+function matchesQuery(company, query) {
+    const searchableText = `${company.name} ${company.director} ${company.state} ${company.district} ${company.sector}`.toLowerCase();
+    return searchableText.includes(query);
+}
+
+// State and district choose shards; a text query uses the prebuilt index
+async function searchShards(query, state, district, id) {
+    let shards = allShards;
+    if (state) shards = shards.filter(shard => shard.state === state);
+    if (district) shards = shards.filter(shard => shard.name === district);
+    if (!query) {
+        return shardView(shards, !state && !district);
+    }
+    if (manifest.search) {
+        // No searchable words (only punctuation or non-Latin letters): as in the
+        // app, list the chosen state or district, or find nothing; never scan every shard
+        if (!tokenize(query).length) return state || district ? shardView(shards, false) : arrayView([], false);
+        const selected = new Set(shards);
+        const matching = async fuzzy => {
+            const ordinals = await searchOrdinals(query, fuzzy);
+            return state || district ? ordinals.filter(ordinal => selected.has(shardAt(ordinal))) : ordinals;
+        };
+        let ordinals = await matching(false);
+        if (ordinals.length) return ordinalView(ordinals);
+        // Nothing spelt this way: accept similar spellings instead
+        ordinals = await matching(true);
+        const view = ordinalView(ordinals);
+        view.fuzzy = true;
+        return view;
+    }
+
+    // Shards built without an index: read each one and keep the matches
+    const matches = [];
+    for (let i = 0; i < shards.length; i++) {
+        if (shards.length > 1) {
+            self.postMessage({ type: 'progress', id,
+                               message: `🔍 Searching ${shards[i].name}, ${shards[i].state} (${i + 1} of ${shards.length})...` });
+        }
+        const companies = await loadShard(shards[i]);
+        if (id !== latestSearch) return null;
+        companies.forEach(company => {
+            if (matchesQuery(company, query)) matches.push(company);
+        });
+    }
+    return arrayView(matches, false);
+}
@@ -0,0 +1,110 @@
+"""
+Spelling-tolerant matching of search terms against the index vocabulary.
+
+Indian names have many accepted spellings (Shree/Shri/Sri, Agarwal/Aggarwal,
+Bhatia/Batia) on top of ordinary typos, and an exact token lookup misses
+all of them. FuzzyIndex maps a query term to the vocabulary tokens spelt
+like it, in two steps:
+
+- every token is reduced to a phonetic key: common transliteration
+  variants are folded together (shr -> sr, ee -> i, bh -> b, w -> v...)
+  and doubled letters collapsed, so spellings of the same name share a key
+- keys are indexed by their trigrams (three-letter windows, padded at the
+  ends), and a term matches the keys whose trigram sets are most alike,
+  scored as shared / (all distinct trigrams of both) as in pg_trgm
+
+A lookup reads one short list of keys per trigram of the term instead of
+comparing the term with every token, so its cost depends on the term, not
+on the size of the dataset. The search index then unions the postings of
+the matched tokens (see SearchIndex.fuzzy_search).
+"""
+
+import re
+from array import array
+from collections import Counter
+
+# Applied in order; earlier rules see the original spelling
+PHONETIC_RULES = (
+    ('shr', 'sr'), ('ee', 'i'), ('oo', 'u'), ('ph', 'f'), ('ck', 'k'), ('q', 'k'),
+    ('w', 'v'), ('z', 'j'), ('bh', 'b'), ('dh', 'd'), ('gh', 'g'), ('kh', 'k'), ('th', 't'),
+)
+
+# Lowest trigram similarity accepted as another spelling of a term
+SIMILARITY = 0.35
+
+# Most tokens a term expands to, best first
+MAX_EXPANSIONS = 10
+
+# Shorter terms (and numbers) are only matched exactly
+MIN_LENGTH = 3
+
+_DOUBLED = re.compile(r'([a-z])\1+')
+
+
+def phonetic_key(token):
+    """Token with transliteration variants folded and doubled letters collapsed"""
+    for old, new in PHONETIC_RULES:
+        token = token.replace(old, new)
+    return _DOUBLED.sub(r'\1', token)
+
+
+def trigrams(key):
+    """Distinct three-letter windows of a key padded with two spaces before, one after"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Trigram similarity of two keys, from 0 (nothing shared) to 1"""
+    a, b = trigrams(a), trigrams(b)
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class FuzzyIndex:
+    """Phonetic key -> tokens, and trigram -> keys, over a token vocabulary"""
+
+    def __init__(self, vocabulary):
+        tokens_by_key = {}
+        for token in vocabulary:
+            if len(token) >= MIN_LENGTH and not token.isdigit():
+                tokens_by_key.setdefault(phonetic_key(token), []).append(token)
+
+        self.keys = sorted(tokens_by_key)
+        self.tokens = [tokens_by_key[key] for key in self.keys]
+        self.sizes = array('H', (len(trigrams(key)) for key in self.keys))
+        building = {}
+        for number, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                building.setdefault(gram, array('I')).append(number)
+        self.grams = building
+
+    def __len__(self):
+        return len(self.keys)
+
+    def similar(self, term, limit=MAX_EXPANSIONS):
+        """Up to limit vocabulary tokens spelt like term, most similar first
+        (tokens sharing its phonetic key come first, the term itself included)"""
+        if len(term) < MIN_LENGTH or term.isdigit():
+            return []
+        grams = trigrams(phonetic_key(term))
+        shared = Counter()
+        for gram in grams:
+            numbers = self.grams.get(gram)
+            if numbers is not None:
+                shared.update(numbers)
+
+        size = len(grams)
+        scored = []
+        for number, n in shared.items():
+            score = n / (size + self.sizes[number] - n)
+            if score >= SIMILARITY:
+                scored.append((-score, self.keys[number], number))
+        scored.sort()
+
+        matches = []
+        for _, _, number in scored:
+            matches.extend(self.tokens[number])
+            if len(matches) >= limit:
+                break
+        return matches[:limit]
@@ -2,21 +2,54 @@
 """
 Generate Indian Business Directory with 1 Million Companies
 This script creates realistic company data across all 28 Indian states
-Optimized for large-scale generation with efficient memory usage
+Optimized for large-scale generation with efficient memory usage:
+companies are written to disk as they are generated, so memory stays flat
+at any target size
+
+Generation is split into shards of up to SHARD_SIZE companies per state.
+Each shard is seeded from (seed, state, shard number) and its ids are fixed
+up front, so shards can run on a process pool (--workers N) and the output
+is byte-for-byte the same for a given --seed whatever the worker count.
+
+Director first names come from a pool of --name-pool values sampled from
+Faker once per process (0 calls Faker for every company instead).
+
+With --columnar the dataset is also saved as data/companies.col, the binary
+columnar file the app memory-maps instead of parsing JSON (see columnar_format).
+With --static it is also split into the per-district shard files that
+simple_index.html loads on demand (see build_static_data).
+With --compress every data file also gets gzip (and brotli) copies and a
+content hash in data/assets.json, which the app serves from /data/ (see
+data_assets).
+With --format ndjson (one company per line) simple_index.html can also read
+data/companies.ndjson as it downloads and show results before it completes.
+The app and the site load whichever of companies.json and companies.ndjson is
+newer, so the new file is used; --replace also deletes the other format's files.
+
+Usage: python generate_million_companies.py [--count N] [--format json|ndjson]
+                                            [--workers N] [--seed S] [--name-pool N]
+                                            [--columnar] [--static] [--compress] [--replace]
 """
 
+import argparse
 import json
 import random
 import os
+import shutil
+from multiprocessing import Pool
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 from faker import Faker
 
+from build_static_data import build_static_data
+from columnar_format import convert
+from data_assets import compress_assets
+from name_pool import NamePool
+
 # Initialize Faker with Indian locale
 fake = Faker('en_IN')
 
-print("🇮🇳 Generating 1 Million Indian Companies...")
-print("This will take several minutes to complete...")
-
 # Load states data
 with open('data/states.json', 'r', encoding='utf-8') as f:
     states_data = json.load(f)
@@ -54,24 +87,32 @@ common_surnames = [
     'Chopra', 'Malhotra', 'Arora', 'Kapoor', 'Bhatia', 'Sethi', 'Khanna'
 ]
 
+SHARD_SIZE = 50000
+
 # Pre-generate city names from all states
 all_cities = []
 for state in states_data:
     all_cities.extend(state.get('districts', []))
 
+PHONE_PREFIXES = ['9', '8', '7', '6']
+EMAIL_SUFFIXES = ['com', 'co.in', 'in', 'org', 'net']
+EMAIL_DOMAINS = ['gmail', 'yahoo', 'rediffmail']
+WEBSITE_EXTENSIONS = ['com', 'co.in', 'in', 'org']
+BUILDING_TYPES = ['Plot', 'Building', 'Complex', 'Tower', 'Plaza', 'Center', 'House']
+ROAD_TYPES = ['Road', 'Street', 'Lane', 'Avenue', 'Marg', 'Path']
+EMPLOYEE_RANGES = ['1-10', '11-50', '51-200', '201-500', '501-1000', '1000+']
+
 def generate_indian_phone():
     """Generate realistic Indian mobile numbers"""
-    prefixes = ['9', '8', '7', '6']
-    return f"+91 {random.choice(prefixes)}{random.randint(100000000, 999999999)}"
+    return f"+91 {random.choice(PHONE_PREFIXES)}{random.randint(100000000, 999999999)}"
 
 def generate_email(company_name):
     """Generate email addresses based on company name"""
-    domain_suffixes = ['com', 'co.in', 'in', 'org', 'net']
     clean_name = ''.join(c for c in company_name if c.isalnum())[:12].lower()
     if len(clean_name) < 3:
         clean_name = 'company'
-    domains = ['gmail', 'yahoo', 'rediffmail', clean_name]
-    return f"info@{random.choice(domains)}.{random.choice(domain_suffixes)}"
+    domains = EMAIL_DOMAINS + [clean_name]
+    return f"info@{random.choice(domains)}.{random.choice(EMAIL_SUFFIXES)}"
 
 def generate_website(company_name):
     """Generate website URLs"""
@@ -80,8 +121,7 @@ def generate_website(company_name):
     clean_name = ''.join(c for c in company_name if c.isalnum())[:15].lower()
     if len(clean_name) < 3:
         clean_name = 'company'
-    extensions = ['com', 'co.in', 'in', 'org']
-    return f"https://www.{clean_name}.{random.choice(extensions)}"
+    return f"https://www.{clean_name}.{random.choice(WEBSITE_EXTENSIONS)}"
 
 def generate_company_name():
     """Generate realistic Indian company names"""
@@ -94,49 +134,47 @@ def generate_company_name():
     ]
     return random.choice(patterns)
 
+# Postal code ranges by state
+STATE_PINCODE_RANGES = {
+    'Andhra Pradesh': (500000, 534999),
+    'Arunachal Pradesh': (790000, 792999),
+    'Assam': (781000, 788999),
+    'Bihar': (800000, 855999),
+    'Chhattisgarh': (490000, 497999),
+    'Goa': (403000, 403999),
+    'Gujarat': (360000, 396999),
+    'Haryana': (121000, 136999),
+    'Himachal Pradesh': (170000, 177999),
+    'Jharkhand': (810000, 835999),
+    'Karnataka': (560000, 591999),
+    'Kerala': (670000, 695999),
+    'Madhya Pradesh': (450000, 488999),
+    'Maharashtra': (400000, 445999),
+    'Manipur': (795000, 795999),
+    'Meghalaya': (793000, 794999),
+    'Mizoram': (796000, 796999),
+    'Nagaland': (797000, 798999),
+    'Odisha': (750000, 770999),
+    'Punjab': (140000, 160999),
+    'Rajasthan': (300000, 345999),
+    'Sikkim': (737000, 737999),
+    'Tamil Nadu': (600000, 643999),
+    'Telangana': (500000, 509999),
+    'Tripura': (799000, 799999),
+    'Uttar Pradesh': (200000, 285999),
+    'Uttarakhand': (240000, 263999),
+    'West Bengal': (700000, 743999)
+}
+
 def generate_pincode(state_name):
     """Generate realistic Indian postal codes by state"""
-    state_pincode_ranges = {
-        'Andhra Pradesh': (500000, 534999),
-        'Arunachal Pradesh': (790000, 792999),
-        'Assam': (781000, 788999),
-        'Bihar': (800000, 855999),
-        'Chhattisgarh': (490000, 497999),
-        'Goa': (403000, 403999),
-        'Gujarat': (360000, 396999),
-        'Haryana': (121000, 136999),
-        'Himachal Pradesh': (170000, 177999),
-        'Jharkhand': (810000, 835999),
-        'Karnataka': (560000, 591999),
-        'Kerala': (670000, 695999),
-        'Madhya Pradesh': (450000, 488999),
-        'Maharashtra': (400000, 445999),
-        'Manipur': (795000, 795999),
-        'Meghalaya': (793000, 794999),
-        'Mizoram': (796000, 796999),
-        'Nagaland': (797000, 798999),
-        'Odisha': (750000, 770999),
-        'Punjab': (140000, 160999),
-        'Rajasthan': (300000, 345999),
-        'Sikkim': (737000, 737999),
-        'Tamil Nadu': (600000, 643999),
-        'Telangana': (500000, 509999),
-        'Tripura': (799000, 799999),
-        'Uttar Pradesh': (200000, 285999),
-        'Uttarakhand': (240000, 263999),
-        'West Bengal': (700000, 743999)
-    }
-    
-    range_tuple = state_pincode_ranges.get(state_name, (100000, 999999))
+    range_tuple = STATE_PINCODE_RANGES.get(state_name, (100000, 999999))
     return str(random.randint(range_tuple[0], range_tuple[1]))
 
 def generate_address(district, state, pincode):
     """Generate realistic Indian addresses"""
-    building_types = ['Plot', 'Building', 'Complex', 'Tower', 'Plaza', 'Center', 'House']
-    road_types = ['Road', 'Street', 'Lane', 'Avenue', 'Marg', 'Path']
-    
-    building = f"{random.randint(1, 999)} {random.choice(building_types)}"
-    road = f"{random.choice(common_surnames)} {random.choice(road_types)}"
+    building = f"{random.randint(1, 999)} {random.choice(BUILDING_TYPES)}"
+    road = f"{random.choice(common_surnames)} {random.choice(ROAD_TYPES)}"
     
     return f"{building}, {road}, {district}, {state} - {pincode}"
 
@@ -155,8 +193,7 @@ def generate_company_data(company_id, state_info):
     address = generate_address(district, state_name, pincode)
     established = random.randint(1980, 2024)
     
-    employee_ranges = ['1-10', '11-50', '51-200', '201-500', '501-1000', '1000+']
-    employees = random.choice(employee_ranges)
+    employees = random.choice(EMPLOYEE_RANGES)
     
     return {
         'id': company_id,
@@ -174,6 +211,100 @@ def generate_company_data(company_id, state_info):
         'employees': employees
     }
 
+def clean_word(text):
+    """Lower-cased letters and digits of text, as used in emails and URLs"""
+    return ''.join(c for c in text if c.isalnum()).lower()
+
+# Every word a company name is built from, cleaned once instead of per company
+clean_words = {word: clean_word(word) for word in
+               name_prefixes + common_surnames + business_sectors + company_suffixes + all_cities}
+
+def generate_company_batch(first_id, count, state_info, names=None):
+    """Generate `count` companies for a state in one go.
+
+    Every random column is drawn for the whole batch with random.choices, and
+    the cleaned name used for emails and websites is joined from pre-cleaned
+    words, so the per-company loop only formats strings. Same fields and
+    value distributions as generate_company_data(). With a NamePool the
+    director first names are drawn from it instead of from Faker.
+    """
+    choices = random.choices
+    state_name = state_info['name']
+    pincode_low, pincode_high = STATE_PINCODE_RANGES.get(state_name, (100000, 999999))
+
+    districts = choices(state_info.get('districts', [state_name]), k=count)
+    patterns = choices(range(5), k=count)
+    prefixes = choices(name_prefixes, k=count)
+    surnames = choices(common_surnames, k=count)
+    partners = choices(common_surnames, k=count)
+    name_sectors = choices(business_sectors, k=count)
+    cities = choices(all_cities, k=count)
+    suffixes = choices(company_suffixes, k=count)
+    if names is not None:
+        first_names = names.choices('first_name', count)
+    else:
+        first_names = [fake.first_name() for _ in range(count)]
+    director_surnames = choices(common_surnames, k=count)
+    phone_prefixes = choices(PHONE_PREFIXES, k=count)
+    phone_numbers = choices(range(100000000, 1000000000), k=count)
+    email_domains = choices(range(len(EMAIL_DOMAINS) + 1), k=count)
+    email_suffixes = choices(EMAIL_SUFFIXES, k=count)
+    has_website = choices((False, True), weights=(40, 60), k=count)
+    website_extensions = choices(WEBSITE_EXTENSIONS, k=count)
+    sectors = choices(business_sectors, k=count)
+    pincodes = choices(range(pincode_low, pincode_high + 1), k=count)
+    building_numbers = choices(range(1, 1000), k=count)
+    building_types = choices(BUILDING_TYPES, k=count)
+    road_names = choices(common_surnames, k=count)
+    road_types = choices(ROAD_TYPES, k=count)
+    years = choices(range(1980, 2025), k=count)
+    employees = choices(EMPLOYEE_RANGES, k=count)
+
+    # Name pattern -> (first word, second word), as in generate_company_name()
+    word_columns = [(prefixes, surnames), (surnames, name_sectors), (prefixes, name_sectors),
+                    (cities, name_sectors), (surnames, partners)]
+
+    companies = []
+    for i in range(count):
+        pattern = patterns[i]
+        first, second = word_columns[pattern]
+        first, second, suffix = first[i], second[i], suffixes[i]
+        if pattern == 4:
+            name = f"{first} & {second} {suffix}"
+        else:
+            name = f"{first} {second} {suffix}"
+        clean_name = clean_words[first] + clean_words[second] + clean_words[suffix]
+
+        domain = email_domains[i]
+        if domain < len(EMAIL_DOMAINS):
+            domain = EMAIL_DOMAINS[domain]
+        else:
+            domain = clean_name[:12] if len(clean_name[:12]) >= 3 else 'company'
+        website = ""
+        if has_website[i]:
+            host = clean_name[:15] if len(clean_name[:15]) >= 3 else 'company'
+            website = f"https://www.{host}.{website_extensions[i]}"
+
+        district = districts[i]
+        pincode = str(pincodes[i])
+        companies.append({
+            'id': first_id + i,
+            'name': name,
+            'director': f"{first_names[i]} {director_surnames[i]}",
+            'phone': f"+91 {phone_prefixes[i]}{phone_numbers[i]}",
+            'email': f"info@{domain}.{email_suffixes[i]}",
+            'website': website,
+            'state': state_name,
+            'district': district,
+            'address': f"{building_numbers[i]} {building_types[i]}, {road_names[i]} {road_types[i]}, "
+                       f"{district}, {state_name} - {pincode}",
+            'pincode': pincode,
+            'sector': sectors[i],
+            'established': years[i],
+            'employees': employees[i]
+        })
+    return companies
+
 def calculate_state_distribution(total_companies):
     """Calculate how many companies per state based on population"""
     # Rough population-based distribution
@@ -229,9 +360,150 @@ def calculate_state_distribution(total_companies):
     
     return distribution
 
+def serialize(company):
+    return json.dumps(company, ensure_ascii=False, separators=(',', ':'))
+
+
+@lru_cache(maxsize=1)
+def seeded_name_pool(seed, size):
+    """Name pool sampled from a Faker seeded by the dataset seed, built once per process"""
+    faker = Faker('en_IN')
+    faker.seed_instance(f"{seed}:names")
+    return NamePool(faker, size)
+
+
+def plan_shards(state_distribution, seed, pool_size=0):
+    """Shard tasks (seed, state index, shard number, first id, count, pool size) in id order"""
+    tasks = []
+    next_id = 1
+    for state_index, state_info in enumerate(states_data):
+        target_count = state_distribution.get(state_info['name'], 1000)
+        for shard, start in enumerate(range(0, target_count, SHARD_SIZE)):
+            count = min(SHARD_SIZE, target_count - start)
+            tasks.append((seed, state_index, shard, next_id, count, pool_size))
+            next_id += count
+    return tasks
+
+
+def generate_shard(task):
+    """Serialised companies of one shard, plus its sector counts.
+
+    Reseeds both random and Faker from the shard itself, so the result does
+    not depend on which worker runs it or what that worker ran before.
+    """
+    seed, state_index, shard, first_id, count, pool_size = task
+    state_info = states_data[state_index]
+    shard_seed = f"{seed}:{state_info['name']}:{shard}"
+    random.seed(shard_seed)
+    fake.seed_instance(shard_seed)
+
+    names = seeded_name_pool(seed, pool_size) if pool_size else None
+    companies = generate_company_batch(first_id, count, state_info, names)
+    sector_counts = Counter(company['sector'] for company in companies)
+    return task, [serialize(company) for company in companies], sector_counts
+
+
+class CompanyWriter:
+    """Streams companies to a file as a JSON array or as NDJSON (one per line)"""
+
+    def __init__(self, path, file_format='json', batch_size=10000):
+        self.path = path
+        self.format = file_format
+        self.batch_size = batch_size
+        self.batch = []
+        self.count = 0
+        self.file = open(path, 'w', encoding='utf-8')
+        if self.format == 'json':
+            self.file.write('[')
+
+    def write(self, company):
+        self.write_serialized([serialize(company)])
+
+    def write_serialized(self, texts):
+        """Write companies already serialised by serialize()"""
+        self.batch.extend(texts)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if self.format == 'json':
+            self.file.write((',' if self.count else '') + ','.join(self.batch))
+        else:
+            self.file.write('\n'.join(self.batch) + '\n')
+        self.count += len(self.batch)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        if self.format == 'json':
+            self.file.write(']')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def link_or_copy(source, target):
+    """Make target the same file as source: a hard link if possible, else a copy"""
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+        return 'linked'
+    except OSError:
+        shutil.copyfile(source, target)
+        return 'copied'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the Indian company directory")
+    parser.add_argument('--count', type=int, default=1000000, help="target number of companies")
+    parser.add_argument('--format', choices=('json', 'ndjson'), default='json',
+                        help="JSON array (default) or one JSON object per line")
+    parser.add_argument('--workers', type=int, default=1, help="generator processes")
+    parser.add_argument('--seed', type=int, help="seed for a reproducible dataset (random if omitted)")
+    parser.add_argument('--name-pool', type=int, default=10000,
+                        help="Faker names sampled up front per process (0 = call Faker per company)")
+    parser.add_argument('--columnar', action='store_true',
+                        help="also write data/companies.col for fast app start-up")
+    parser.add_argument('--static', action='store_true',
+                        help="also write data/shards/ for simple_index.html")
+    parser.add_argument('--compress', action='store_true',
+                        help="also write .gz/.br copies and data/assets.json (see data_assets)")
+    parser.add_argument('--replace', action='store_true',
+                        help="delete the other format's dataset files in data/")
+    return parser.parse_args()
+
+
+def remove_other_format(file_format, data_dir='data'):
+    """Delete the other format's dataset files (and compressed copies), so the
+    app and the static site cannot pick different datasets; returns the paths"""
+    other = 'ndjson' if file_format == 'json' else 'json'
+    removed = []
+    for name in (f'companies_1million.{other}', f'companies.{other}'):
+        for suffix in ('', '.gz', '.br'):
+            path = os.path.join(data_dir, name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+                removed.append(path)
+    return removed
+
+
 def main():
     """Main function to generate 1 million companies"""
-    target_companies = 1000000
+    args = parse_args()
+    target_companies = args.count
+    extension = 'json' if args.format == 'json' else 'ndjson'
+    output_path = f'data/companies_1million.{extension}'
+    compat_path = f'data/companies.{extension}'
+
+    print("🇮🇳 Generating 1 Million Indian Companies...")
+    print("This will take several minutes to complete...")
     print(f"Target: {target_companies:,} companies")
     
     # Calculate distribution
@@ -242,75 +514,83 @@ def main():
         print(f"  {state}: {count:,}")
     print("  ... and others")
     
-    # Generate companies in batches to manage memory
-    batch_size = 10000
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    tasks = plan_shards(state_distribution, seed, max(args.name_pool, 0))
+    workers = max(args.workers, 1)
+    print(f"\nSeed: {seed} ({len(tasks)} shards on {workers} worker{'s' if workers > 1 else ''})")
+    
+    # Companies go straight to disk; only the running statistics stay in memory
     total_generated = 0
-    all_companies = []
+    state_counts = Counter()
+    sector_counts = Counter()
     
-    print(f"\nStarting generation in batches of {batch_size:,}...")
+    print(f"Streaming companies to {output_path}...")
     
-    for state_info in states_data:
-        state_name = state_info['name']
-        target_count = state_distribution.get(state_name, 1000)
-        
-        print(f"\nGenerating {target_count:,} companies for {state_name}...")
-        
-        state_companies = []
-        for i in range(target_count):
-            company_id = total_generated + i + 1
-            company = generate_company_data(company_id, state_info)
-            state_companies.append(company)
-            
-            # Progress indicator
-            if (i + 1) % 5000 == 0:
-                print(f"  Generated {i + 1:,}/{target_count:,} for {state_name}")
-        
-        all_companies.extend(state_companies)
-        total_generated += len(state_companies)
-        
-        print(f"✓ Completed {state_name}: {len(state_companies):,} companies")
-        print(f"Total so far: {total_generated:,}")
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        # imap hands shards back in submission order, i.e. in id order
+        shards = pool.imap(generate_shard, tasks) if pool else map(generate_shard, tasks)
+        with CompanyWriter(output_path, args.format) as writer:
+            for (_, state_index, shard, _, count, _), texts, shard_sectors in shards:
+                state_name = states_data[state_index]['name']
+                writer.write_serialized(texts)
+                state_counts[state_name] += count
+                sector_counts.update(shard_sectors)
+                total_generated += count
+                
+                print(f"✓ {state_name} shard {shard + 1}: {count:,} companies "
+                      f"(total so far: {total_generated:,})")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
     
-    print(f"\n🎉 Generated {len(all_companies):,} companies total!")
+    print(f"\n🎉 Generated {total_generated:,} companies total!")
     
-    # Save to file
-    print("\nSaving to data/companies_1million.json...")
-    with open('data/companies_1million.json', 'w', encoding='utf-8') as f:
-        json.dump(all_companies, f, ensure_ascii=False, indent=None, separators=(',', ':'))
+    # The compatibility file has the same content, so link (or copy) it instead of re-serialising
+    how = link_or_copy(output_path, compat_path)
+    print(f"Updated {compat_path} ({how} from {output_path})")
+    if args.replace:
+        for path in remove_other_format(args.format):
+            print(f"Removed {path} (other format, --replace)")
     
-    # Also update the original file for compatibility
-    print("Updating data/companies.json...")
-    with open('data/companies.json', 'w', encoding='utf-8') as f:
-        json.dump(all_companies, f, ensure_ascii=False, indent=None, separators=(',', ':'))
+    if args.columnar:
+        columnar_path = 'data/companies.col'
+        convert(output_path, columnar_path)
+        print(f"Wrote {columnar_path} ({os.path.getsize(columnar_path) / (1024*1024):.1f} MB)")
     
-    # Generate statistics
-    print("\n=== FINAL STATISTICS ===")
-    print(f"Total Companies: {len(all_companies):,}")
-    print(f"File size: ~{os.path.getsize('data/companies_1million.json') / (1024*1024):.1f} MB")
+    if args.static:
+        manifest = build_static_data(output_path, 'data/shards')
+        shards = sum(len(state['districts']) for state in manifest['states'])
+        print(f"Wrote {shards} shard files and data/shards/manifest.json")
     
-    # Top states by company count
-    state_counts = {}
-    sector_counts = {}
+    if args.compress:
+        assets = compress_assets('data')
+        print(f"Compressed {len(assets)} data files (data/assets.json)")
     
-    for company in all_companies:
-        state = company['state']
-        sector = company['sector']
-        
-        state_counts[state] = state_counts.get(state, 0) + 1
-        sector_counts[sector] = sector_counts.get(sector, 0) + 1
+    # Generate statistics
+    print("\n=== FINAL STATISTICS ===")
+    print(f"Total Companies: {total_generated:,}")
+    print(f"File size: ~{os.path.getsize(output_path) / (1024*1024):.1f} MB")
     
     print(f"\nTop 10 States by Company Count:")
-    for state, count in sorted(state_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for state, count in state_counts.most_common(10):
         print(f"  {state}: {count:,}")
     
     print(f"\nTop 10 Business Sectors:")
-    for sector, count in sorted(sector_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for sector, count in sector_counts.most_common(10):
         print(f"  {sector}: {count:,}")
     
-    print(f"\n✅ Successfully generated {len(all_companies):,} Indian companies!")
+    print(f"\n✅ Successfully generated {total_generated:,} Indian companies!")
     print("Files saved:")
-    print("  - data/companies_1million.json (new large dataset)")
-    print("  - data/companies.json (updated for compatibility)")
+    print(f"  - {output_path} (new large dataset)")
+    print(f"  - {compat_path} (updated for compatibility)")
+    if args.columnar:
+        print(f"  - data/companies.col (columnar copy loaded by the app)")
+    if args.static:
+        print(f"  - data/shards/ (per-district files for simple_index.html)")
+    if args.compress:
+        print(f"  - data/**/*.gz, *.br and data/assets.json (precompressed copies served by the app)")
 
 if __name__ == "__main__":
     start_time = datetime.now()
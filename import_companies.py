@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Bulk import companies into the SQLite database.
+
+Streams data/companies.json or a .ndjson file (the output of
+generate_million_companies.py) into the companies table in batches. The
+load runs in WAL mode with the indexes dropped, and the indexes are rebuilt
+once at the end, which is far faster than maintaining them row by row. The FTS5 search table is rebuilt
+from the new rows at the same time, so it always matches the import. A
+row in company_imports then marks the new data for the app's caches.
+
+Run through Flask:      flask --app main import-companies data/companies.json
+Or directly:            python import_companies.py data/companies.json instance/business_directory.db
+"""
+
+import argparse
+import sqlite3
+import time
+
+import click
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from company_db import create_fts_statements
+from company_models import Company, CompanyCount, CompanyImport
+from company_store import count_projections, iter_companies
+
+
+def _ddl(element):
+    return str(element.compile(dialect=sqlite.dialect())).strip()
+
+
+def import_companies(json_path, db_path, batch_size=10000):
+    """Replace the companies table with the contents of json_path"""
+    table = Company.__table__
+    columns = ', '.join(Company.FIELDS)
+    placeholders = ', '.join('?' for _ in Company.FIELDS)
+    insert = f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders})"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(_ddl(CreateTable(table, if_not_exists=True)))
+        for index in table.indexes:
+            conn.execute(f"DROP INDEX IF EXISTS {index.name}")
+        conn.execute(f"DELETE FROM {table.name}")
+
+        total = 0
+        batch = []
+        for company in iter_companies(json_path):
+            batch.append(tuple(company.get(field) for field in Company.FIELDS))
+            if len(batch) >= batch_size:
+                conn.executemany(insert, batch)
+                total += len(batch)
+                batch = []
+                if total % (batch_size * 10) == 0:
+                    print(f"  Imported {total:,} companies")
+        if batch:
+            conn.executemany(insert, batch)
+            total += len(batch)
+        conn.commit()
+
+        print("Creating indexes...")
+        for index in table.indexes:
+            conn.execute(_ddl(CreateIndex(index)))
+
+        print("Counting companies per state, district and sector...")
+        store_counts(conn)
+
+        print("Building full-text index...")
+        for statement in create_fts_statements():
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        record_import(conn, json_path, total)
+        conn.commit()
+        conn.execute("PRAGMA synchronous=NORMAL")
+    finally:
+        conn.close()
+    return total
+
+
+def store_counts(conn):
+    """Rewrite company_counts from the companies table"""
+    counts_table = CompanyCount.__table__
+    conn.execute(_ddl(CreateTable(counts_table, if_not_exists=True)))
+    conn.execute(f"DELETE FROM {counts_table.name}")
+
+    # Keep the first spelling seen for each case-insensitive value
+    triples = {}
+    spellings = ({}, {}, {})
+    for state, district, sector, n in conn.execute(
+            "SELECT state, district, sector, count(*) FROM companies GROUP BY 1, 2, 3"):
+        state, district, sector = (spelling.setdefault(value.lower(), value)
+                                   for spelling, value in zip(spellings, (state, district, sector or '')))
+        triples[(state, district, sector)] = triples.get((state, district, sector), 0) + n
+    conn.executemany(
+        f"INSERT INTO {counts_table.name} (state, district, sector, companies) VALUES (?, ?, ?, ?)",
+        [key + (n,) for key, n in count_projections(triples).items()])
+    return triples
+
+
+def record_import(conn, source, total):
+    """Add a company_imports row: the app's caches key on the latest one"""
+    imports_table = CompanyImport.__table__
+    conn.execute(_ddl(CreateTable(imports_table, if_not_exists=True)))
+    conn.execute(f"INSERT INTO {imports_table.name} (source, companies, imported_at) VALUES (?, ?, ?)",
+                 (source, total, time.time()))
+
+
+def register_cli(app):
+    """Add `flask import-companies` to the app"""
+
+    @app.cli.command('import-companies')
+    @click.argument('json_path', default='data/companies.json')
+    @click.option('--batch-size', default=10000, show_default=True)
+    def import_companies_command(json_path, batch_size):
+        """Bulk import companies from a JSON file into the database."""
+        from extensions import db
+
+        started = time.perf_counter()
+        total = import_companies(json_path, db.engine.url.database, batch_size)
+        print(f"✅ Imported {total:,} companies in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import companies into SQLite")
+    parser.add_argument('json_path', nargs='?', default='data/companies.json')
+    parser.add_argument('db_path', nargs='?', default='instance/business_directory.db')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total = import_companies(args.json_path, args.db_path, args.batch_size)
+    print(f"✅ Imported {total:,} companies in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
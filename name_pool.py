@@ -0,0 +1,50 @@
+"""
+Pre-sampled pools of Faker values for the company generators.
+
+A Faker call costs several microseconds, which dominates generation once
+everything else is batched. NamePool draws `size` values from each
+provider method the first time it is used and then picks from them with
+random.choice, so generating a company never calls Faker. A few thousand
+samples cover the en_IN name and city lists, so the output keeps the same
+mix of values. Full names are the exception: a pool of them would repeat
+each director every few companies, so name() combines a pooled first name
+with a pooled last name instead.
+"""
+
+import random
+
+
+class NamePool:
+    """Stands in for a Faker instance: pool.first_name() picks from a sampled pool"""
+
+    def __init__(self, faker, size=10000):
+        self.faker = faker
+        self.size = size
+        self.pools = {}
+
+    def values(self, method):
+        """The sampled values of a provider method, drawn on first use"""
+        pool = self.pools.get(method)
+        if pool is None:
+            generate = getattr(self.faker, method)
+            pool = self.pools[method] = [generate() for _ in range(self.size)]
+        return pool
+
+    def choices(self, method, k):
+        """k values of a provider method at once"""
+        if method == 'name':
+            first_names = random.choices(self.values('first_name'), k=k)
+            last_names = random.choices(self.values('last_name'), k=k)
+            return [f"{first} {last}" for first, last in zip(first_names, last_names)]
+        return random.choices(self.values(method), k=k)
+
+    def name(self):
+        return self.choices('name', 1)[0]
+
+    def __getattr__(self, method):
+        # Only reached for missing attributes: while unpickling or copying, the
+        # pool's own attributes are not set yet and must not be looked up here
+        if method.startswith('_') or method in ('faker', 'size', 'pools'):
+            raise AttributeError(method)
+        values = self.values(method)
+        return lambda: random.choice(values)
@@ -0,0 +1,234 @@
+"""
+Cache of rendered HTML pages.
+
+The company data does not change between imports, so the home page, state
+listings and popular searches render to the same HTML every time. PageCache
+keeps rendered bodies keyed on endpoint + normalised query string + a
+version string (the dataset and templates, see routes.py), so a new import
+or deploy simply stops matching the old entries.
+
+Two tiers:
+- an in-process LRU bounded by total bytes
+- optionally a directory shared by all gunicorn workers (and restarts),
+  one file per page under a sub-directory per version; directories of
+  other versions are removed when the version changes, and the oldest
+  files are pruned once the directory grows past its byte limit
+
+Only anonymous GET requests with no pending flash messages are cached,
+since the layout shows the logged-in user and flashes.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import threading
+from collections import Counter, OrderedDict
+
+from flask import Response, make_response, request, session
+
+# Check the disk tier's size after this many writes
+PRUNE_EVERY = 100
+
+
+def tree_version(*paths):
+    """Short hash of the names, sizes and mtimes of the given files and the files
+    under the given directories (missing paths are skipped)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for file in files:
+            stat = os.stat(file)
+            digest.update(f"{file}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def page_key(endpoint, view_args, args, version):
+    """Cache key for a request: empty arguments dropped, the rest sorted"""
+    pairs = sorted((name, value) for name, value in args.items(multi=True) if value)
+    return repr((endpoint, sorted(view_args.items()), pairs, version))
+
+
+class PageCache:
+    """Rendered pages in an LRU, optionally backed by a shared directory"""
+
+    def __init__(self, version, max_bytes=32 * 1024 * 1024, directory=None,
+                 disk_max_bytes=512 * 1024 * 1024):
+        self.version = version  # callable returning the current data version
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.counts = Counter()
+        self._disk_version = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached body for a key, or None"""
+        with self._lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+                self.counts['memory_hits'] += 1
+                return body
+        body = self._disk_get(key)
+        with self._lock:
+            self.counts['disk_hits' if body is not None else 'misses'] += 1
+        if body is not None:
+            self._memory_set(key, body)
+        return body
+
+    def set(self, key, body):
+        with self._lock:
+            self.counts['stores'] += 1
+            prune = self.counts['stores'] % PRUNE_EVERY == 0
+        self._memory_set(key, body)
+        self._disk_set(key, body, prune)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._disk_version = None
+
+    def stats(self):
+        """Hit/miss counters of this process plus the in-memory size"""
+        with self._lock:
+            counts = Counter(self.counts)
+            entries, size = len(self.entries), self.size
+        lookups = counts['memory_hits'] + counts['disk_hits'] + counts['misses']
+        hits = lookups - counts['misses']
+        return {
+            'memory_hits': counts['memory_hits'],
+            'disk_hits': counts['disk_hits'],
+            'misses': counts['misses'],
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'stores': counts['stores'],
+            'evictions': counts['evictions'],
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'disk': self.directory,
+        }
+
+    def cached(self, view):
+        """Decorator serving a view's page from the cache when the request allows it"""
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or 'user_id' in session or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            version = self.version()
+            self._use_disk_version(version)
+            key = page_key(request.endpoint, request.view_args or {}, request.args, version)
+            body = self.get(key)
+            if body is not None:
+                response = Response(body, mimetype='text/html')
+                response.headers['X-Page-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            # Pages that flashed a message or set a cookie are specific to this visitor
+            if (response.status_code == 200 and response.mimetype == 'text/html'
+                    and not session.modified and 'Set-Cookie' not in response.headers):
+                self.set(key, response.get_data())
+            response.headers['X-Page-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    def _memory_set(self, key, body):
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(body) > self.max_bytes:
+                return
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.counts['evictions'] += 1
+
+    # Disk tier: <directory>/<version hash>/<key hash>.html
+
+    def _use_disk_version(self, version):
+        """Switch the disk tier to a version, removing other versions' pages"""
+        if not self.directory:
+            return
+        name = hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]
+        if name == self._disk_version:
+            return
+        self._disk_version = name
+        os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+        for other in os.listdir(self.directory):
+            if other != name:
+                # Keys include the version, so those pages can never be hit again
+                shutil.rmtree(os.path.join(self.directory, other), ignore_errors=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, self._disk_version, digest + '.html')
+
+    def _disk_get(self, key):
+        if not self._disk_version:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # recently used pages survive pruning
+        except OSError:
+            pass
+        return body
+
+    def _disk_set(self, key, body, prune=False):
+        if not self._disk_version:
+            return
+        path = self._disk_path(key)
+        partial = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(partial, 'wb') as f:
+                f.write(body)
+            os.replace(partial, path)  # other workers never see a half-written page
+        except OSError:
+            return
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently used files once the directory is over its limit"""
+        directory = os.path.join(self.directory, self._disk_version)
+        files = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:  # removed by a worker on a newer version
+            return
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        if total <= self.disk_max_bytes:
+            return
+        files.sort()
+        target = self.disk_max_bytes * 0.8
+        for _, size, path in files:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
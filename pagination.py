@@ -0,0 +1,95 @@
+"""
+Opaque cursor tokens for keyset pagination.
+
+A cursor records where a page ended (the last company id, or (score, id)
+for ranked search), which way to page, and a fingerprint of the filters
+it was issued for. A cursor from one listing cannot be replayed against a
+different query: it is rejected and the listing starts from the top.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+
+
+class InvalidCursor(ValueError):
+    """Cursor is malformed or was issued for different filters"""
+
+
+def filter_fingerprint(**filters):
+    """Short hash of normalised filter values"""
+    normalised = sorted((key, ' '.join(str(value).lower().split()))
+                        for key, value in filters.items() if value)
+    return hashlib.sha1(json.dumps(normalised).encode('utf-8')).hexdigest()[:10]
+
+
+def position_of(company):
+    """Keyset position of a company in its listing"""
+    if 'score' in company:
+        return (company['score'], company['id'])
+    return company['id']
+
+
+def encode_cursor(direction, position, fingerprint):
+    payload = json.dumps([direction, position, fingerprint], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _company_id(value):
+    if type(value) is not int or value < 0:  # bool is an int subclass
+        raise TypeError("company id expected")
+    return value
+
+
+def _score(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise TypeError("score expected")
+    return float(value)
+
+
+def decode_cursor(token, fingerprint, ranked=False):
+    """(after, before) positions for a cursor token; raises InvalidCursor.
+
+    ranked listings are paged by (score, id) positions, all others by
+    company id; a position of the other kind is rejected.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, position, issued_for = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if issued_for != fingerprint:
+        raise InvalidCursor("Cursor belongs to a different query")
+    # The fingerprint is not a secret, so the position is checked as untrusted input
+    try:
+        if ranked:
+            if not isinstance(position, list) or len(position) != 2:
+                raise TypeError("(score, id) expected")
+            position = (_score(position[0]), _company_id(position[1]))
+        else:
+            position = _company_id(position)
+    except TypeError:
+        raise InvalidCursor("Malformed cursor")
+
+    if direction == 'after':
+        return position, None
+    if direction == 'before':
+        return None, position
+    raise InvalidCursor("Malformed cursor")
+
+
+def page_cursors(companies, has_more, after, before, fingerprint):
+    """Cursor tokens for the previous and next pages (None when there is no such page)"""
+    if not companies:
+        return None, None
+    first = position_of(companies[0])
+    last = position_of(companies[-1])
+    if before is not None:
+        prev_cursor = encode_cursor('before', first, fingerprint) if has_more else None
+        return prev_cursor, encode_cursor('after', last, fingerprint)
+    next_cursor = encode_cursor('after', last, fingerprint) if has_more else None
+    prev_cursor = encode_cursor('before', first, fingerprint) if after is not None else None
+    return prev_cursor, next_cursor
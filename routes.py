@@ -1,15 +1,42 @@
 from flask import render_template, request, redirect, url_for, flash, session, jsonify
 from models import User
-from utils import load_companies_data, load_states_data, search_companies, get_company_by_id
+from company_store import dataset_version, get_store, load_states_data
+from bitmap_index import FACETS
+from pagination import (InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint,
+                        page_cursors)
+from data_assets import send_data_asset
+from page_cache import PageCache, tree_version
+from search_index import tokenize
+from suggest_index import MAX_SUGGESTIONS
 import json
+import os
 from app import app   # ✅ only import app, not db
 from extensions import db   # ✅ import db from extensions instead
 
+PER_PAGE = 20
+MAX_API_LIMIT = 100
+# Old ?page=N links are redirected to their page's cursor; finding it still steps
+# over the ids of every company before the page, so links past this page land on it
+MAX_LEGACY_PAGE = 500
+
+# Templates and states.json only change with a restart, so they are hashed once
+_STATIC_VERSION = tree_version(os.path.join(app.root_path, app.template_folder),
+                               os.path.join(app.root_path, 'data', 'states.json'))
+page_cache = PageCache(lambda: f"{dataset_version()}|{_STATIC_VERSION}",
+                       max_bytes=app.config['PAGE_CACHE_MB'] * 1024 * 1024,
+                       directory=app.config['PAGE_CACHE_DIR'])
+
+
+@app.context_processor
+def inject_company_counts():
+    """Precomputed totals for templates: company_counts.total, .states, .districts, .sectors"""
+    return {'company_counts': get_store().summary}
 
 @app.route('/')
+@page_cache.cached
 def index():
     states_data = load_states_data()
-    recent_companies = load_companies_data()[:12]  # Show first 12 companies
+    recent_companies, _ = get_store().page(limit=12)  # Show first 12 companies
     return render_template('index.html', states=states_data, companies=recent_companies)
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -70,48 +97,143 @@ def dashboard():
         return redirect(url_for('login'))
     
     states_data = load_states_data()
-    companies_count = len(load_companies_data())
+    companies_count = get_store().count()
     
     return render_template('dashboard.html', states=states_data, companies_count=companies_count)
 
+def _filter_expression():
+    """Filter expression from the query string (see bitmap_index).
+
+    ?sector=IT&sector=Software ORs values of one facet, facets are ANDed,
+    ?exclude_<facet>=... negates, and ?filter=<json> adds a full expression.
+    Raises ValueError for a malformed ?filter.
+    """
+    parts = []
+    for facet in FACETS:
+        values = [value for value in request.args.getlist(facet) if value]
+        if values:
+            parts.append({facet: values if len(values) > 1 else values[0]})
+        excluded = [value for value in request.args.getlist(f'exclude_{facet}') if value]
+        if excluded:
+            parts.append({'not': {facet: excluded}})
+    if request.args.get('filter'):
+        try:
+            parts.append(json.loads(request.args['filter']))
+        except RecursionError:
+            raise ValueError("Filter is nested too deeply") from None
+    if len(parts) == 1:
+        return parts[0]
+    return {'and': parts} if parts else {}
+
+def _listing_fingerprint(expr):
+    return filter_fingerprint(filter=json.dumps(expr, sort_keys=True))
+
+def _company_listing(expr, cursor, limit=PER_PAGE):
+    """One keyset page of the filtered company listing plus cursors for its neighbours"""
+    fingerprint = _listing_fingerprint(expr)
+    after, before = decode_cursor(cursor, fingerprint) if cursor else (None, None)
+    
+    result = get_store().filter_page(expr, after=after, before=before, limit=limit)
+    prev_cursor, next_cursor = page_cursors(result['companies'], result['has_more'],
+                                            after, before, fingerprint)
+    return {
+        'companies': result['companies'],
+        'total': result['total'],
+        'prev_cursor': prev_cursor,
+        'next_cursor': next_cursor,
+    }
+
+def _legacy_page_redirect(expr):
+    """Redirect from a ?page=N link (offset pagination) to the cursor of that page,
+    or of the last page when the listing is shorter"""
+    store = get_store()
+    page = max(request.args.get('page', 1, type=int), 1)
+    if page > MAX_LEGACY_PAGE:
+        page = MAX_LEGACY_PAGE
+        # Only worth saying when the listing goes on past that page
+        if store.filter_id_at(expr, MAX_LEGACY_PAGE * PER_PAGE) is not None:
+            flash(f'Page links only reach page {MAX_LEGACY_PAGE}; use Next to go further.', 'info')
+    args = request.args.to_dict(flat=False)
+    args.pop('page')
+
+    # Only the id just before the page is looked up, not the companies leading to it
+    skipped = (page - 1) * PER_PAGE
+    last_id = store.filter_id_at(expr, skipped - 1) if skipped else None
+    if skipped and last_id is None:
+        skipped = (store.filter_count(expr) - 1) // PER_PAGE * PER_PAGE
+        last_id = store.filter_id_at(expr, skipped - 1) if skipped > 0 else None
+    if last_id is not None:
+        args['cursor'] = encode_cursor('after', last_id, _listing_fingerprint(expr))
+    return redirect(url_for('companies', **args))
+
+def _search_listing(query, state, cursor, limit=PER_PAGE, fuzzy=False):
+    """One keyset page of search results plus cursors for its neighbours.
+
+    When no company matches the query's words exactly, other spellings of
+    them are accepted instead; 'fuzzy' in the result tells whether that happened.
+    """
+    fingerprint = filter_fingerprint(q=query, state=state, fuzzy=fuzzy)
+    store = get_store()
+    after, before = (decode_cursor(cursor, fingerprint, ranked=store.ranks(query))
+                     if cursor else (None, None))
+    
+    if not (query or state):
+        return {'companies': [], 'total': 0, 'prev_cursor': None, 'next_cursor': None,
+                'fuzzy': False}
+    if not fuzzy and tokenize(query) and not store.has_matches(query):
+        fuzzy = True
+    # Ranked by relevance when the store supports it (SQLite FTS5)
+    result = store.search_results(query, state, after=after, before=before, limit=limit,
+                                  fuzzy=fuzzy)
+    prev_cursor, next_cursor = page_cursors(result['companies'], result['has_more'],
+                                            after, before, fingerprint)
+    return {
+        'companies': result['companies'],
+        'total': result['total'],
+        'prev_cursor': prev_cursor,
+        'next_cursor': next_cursor,
+        'fuzzy': fuzzy,
+    }
+
+def _api_limit():
+    return max(1, min(request.args.get('limit', PER_PAGE, type=int), MAX_API_LIMIT))
+
 @app.route('/companies')
+@page_cache.cached
 def companies():
     state = request.args.get('state', '')
     district = request.args.get('district', '')
-    page = int(request.args.get('page', 1))
-    per_page = 20
+    sector = request.args.get('sector', '')
     
-    companies_data = load_companies_data()
+    try:
+        expr = _filter_expression()
+        if 'page' in request.args and 'cursor' not in request.args:
+            return _legacy_page_redirect(expr)
+        try:
+            listing = _company_listing(expr, request.args.get('cursor'))
+        except InvalidCursor:
+            # Stale or foreign cursor: start the listing from the top
+            listing = _company_listing(expr, None)
+    except ValueError:
+        flash('Invalid filter.', 'error')
+        listing = _company_listing({}, None)
     states_data = load_states_data()
     
-    # Filter by state and district if provided
-    if state:
-        companies_data = [c for c in companies_data if c['state'].lower() == state.lower()]
-    if district:
-        companies_data = [c for c in companies_data if c['district'].lower() == district.lower()]
-    
-    # Pagination
-    total = len(companies_data)
-    start = (page - 1) * per_page
-    end = start + per_page
-    companies_page = companies_data[start:end]
-    
-    has_prev = page > 1
-    has_next = end < total
-    
     return render_template('companies.html', 
-                         companies=companies_page,
+                         companies=listing['companies'],
                          states=states_data,
                          current_state=state,
                          current_district=district,
-                         page=page,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         total=total)
+                         current_sector=sector,
+                         prev_cursor=listing['prev_cursor'],
+                         next_cursor=listing['next_cursor'],
+                         has_prev=listing['prev_cursor'] is not None,
+                         has_next=listing['next_cursor'] is not None,
+                         total=listing['total'])
 
 @app.route('/company/<int:company_id>')
 def company_detail(company_id):
-    company = get_company_by_id(company_id)
+    company = get_store().company(company_id)
     if not company:
         flash('Company not found.', 'error')
         return redirect(url_for('companies'))
@@ -119,23 +241,78 @@ def company_detail(company_id):
     return render_template('company_detail.html', company=company)
 
 @app.route('/search')
+@page_cache.cached
 def search():
     query = request.args.get('q', '')
     state = request.args.get('state', '')
+    fuzzy = request.args.get('fuzzy') == '1'
     
-    if query or state:
-        results = search_companies(query, state)
-    else:
-        results = []
-    
+    try:
+        listing = _search_listing(query, state, request.args.get('cursor'), fuzzy=fuzzy)
+    except InvalidCursor:
+        listing = _search_listing(query, state, None, fuzzy=fuzzy)
     states_data = load_states_data()
     
     return render_template('search.html', 
-                         results=results, 
+                         results=listing['companies'], 
+                         total=listing['total'],
+                         prev_cursor=listing['prev_cursor'],
+                         next_cursor=listing['next_cursor'],
                          query=query, 
+                         fuzzy=listing['fuzzy'],
                          selected_state=state,
                          states=states_data)
 
+@app.route('/api/companies')
+def api_companies():
+    """JSON company listing, paged with ?cursor= tokens.
+
+    Filters: state, district, sector, employees, established (e.g. 1990-1999),
+    repeated to OR values, exclude_<facet>=..., or ?filter=<json expression>.
+    """
+    try:
+        listing = _company_listing(_filter_expression(), request.args.get('cursor'), _api_limit())
+    except ValueError as e:   # includes InvalidCursor
+        return jsonify({'error': str(e)}), 400
+    return jsonify(listing)
+
+@app.route('/api/search')
+def api_search():
+    """JSON search results with facet counts, paged with ?cursor= tokens.
+
+    Accepts q plus any of the facet filters: state, district, sector, employees.
+    fuzzy=1 accepts other spellings of the query's words, as does a query
+    whose words match no company exactly ('fuzzy' in the response says so).
+    """
+    query = request.args.get('q', '')
+    fuzzy = request.args.get('fuzzy') == '1'
+    filters = {facet: request.args.get(facet, '') for facet in FACETS}
+    fingerprint = filter_fingerprint(q=query, fuzzy=fuzzy, **filters)
+    cursor = request.args.get('cursor')
+    try:
+        after, before = decode_cursor(cursor, fingerprint) if cursor else (None, None)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    store = get_store()
+    if not fuzzy and tokenize(query) and not store.has_matches(query):
+        fuzzy = True
+    try:
+        result = store.facet_search(query, filters, after=after, before=before,
+                                    limit=_api_limit(), fuzzy=fuzzy)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    prev_cursor, next_cursor = page_cursors(result['companies'], result['has_more'],
+                                            after, before, fingerprint)
+    return jsonify({
+        'companies': result['companies'],
+        'total': result['total'],
+        'facets': result['facets'],
+        'prev_cursor': prev_cursor,
+        'next_cursor': next_cursor,
+        'fuzzy': fuzzy,
+    })
+
 @app.route('/api/districts/<state>')
 def get_districts(state):
     """API endpoint to get districts for a state"""
@@ -145,3 +322,26 @@ def get_districts(state):
     if state_info:
         return jsonify(state_info['districts'])
     return jsonify([])
+
+@app.route('/api/suggest')
+def api_suggest():
+    """Typeahead suggestions: ?q=<partly typed text>&limit=<1-10>, most popular first"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', MAX_SUGGESTIONS, type=int), MAX_SUGGESTIONS))
+    return jsonify({'query': query, 'suggestions': get_store().suggest(query, limit)})
+
+@app.route('/data/<path:filename>')
+def data_asset(filename):
+    """Data files for the static site, gzip/brotli encoded when precompressed (see data_assets)"""
+    return send_data_asset(os.path.join(app.root_path, 'data'), filename)
+
+@app.route('/api/page-cache')
+def page_cache_stats():
+    """Hit/miss counts of this worker's rendered page cache"""
+    return jsonify(page_cache.stats())
+
+@app.route('/api/search-cache')
+def search_cache_stats():
+    """Hit/miss counts of this worker's search result cache (in-memory store only)"""
+    cache = getattr(get_store(), 'search_cache', None)
+    return jsonify(cache.stats() if cache else {})
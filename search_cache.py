@@ -0,0 +1,104 @@
+"""
+Bounded cache of search results for CompanyStore.search_rows.
+
+Results are sorted row arrays keyed on (query tokens, lower-cased state).
+People type a query a few letters at a time and repeat popular searches,
+so besides exact hits the cache answers a query from the cached result of a
+shorter one: "sharma te" only needs the rows of "sharma t" checked against
+the tokens starting with "te" (see SearchIndex.refine). A cached query P
+covers a query Q when P's complete words are Q's first words and P's last,
+prefix-matched word is the start of Q's next word, since every company
+matching Q then also matches P. One-word queries are only answered from
+exact entries: reading their own posting lists is cheaper than narrowing.
+Fuzzy results (see fuzzy_index) are kept under their own keys and only
+answer the same fuzzy query, since narrowing them would match exactly.
+
+Entries are evicted least recently used first once their arrays exceed
+the memory budget (SEARCH_CACHE_MB, default 16 MB per process).
+"""
+
+import os
+import threading
+from collections import Counter, OrderedDict
+
+SEARCH_CACHE_BYTES = int(os.environ.get('SEARCH_CACHE_MB', '16')) * 1024 * 1024
+
+# Rough per-entry overhead (key tuple, dict slot, array header) counted against the budget
+ENTRY_OVERHEAD = 200
+
+
+class SearchCache:
+    """LRU of search results with prefix lookup and hit/miss counters"""
+
+    def __init__(self, max_bytes=SEARCH_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(rows):
+        return len(rows) * rows.itemsize + ENTRY_OVERHEAD
+
+    def lookup(self, terms, state, fuzzy=False):
+        """(rows, None) for a cached query, (superset rows, first term to check)
+        for a cached shorter query that covers it, else (None, None)"""
+        terms = tuple(terms)
+        with self._lock:
+            key = (terms, state, 'fuzzy') if fuzzy else (terms, state)
+            rows = self.entries.get(key)
+            if rows is not None:
+                self.entries.move_to_end(key)
+                self.counts['hits'] += 1
+                return rows, None
+            if fuzzy:
+                self.counts['misses'] += 1
+                return None, None
+
+            # Longest covering query first: it has the fewest rows left to check
+            last = len(terms) - 1
+            for i in range(last, -1, -1) if last else ():
+                for end in range(len(terms[i]) - (i == last), 0, -1):
+                    key = (terms[:i] + (terms[i][:end],), state)
+                    rows = self.entries.get(key)
+                    if rows is not None:
+                        self.entries.move_to_end(key)
+                        self.counts['refined'] += 1
+                        return rows, i
+            self.counts['misses'] += 1
+            return None, None
+
+    def put(self, terms, state, rows, fuzzy=False):
+        key = (tuple(terms), state, 'fuzzy') if fuzzy else (tuple(terms), state)
+        cost = self._cost(rows)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= self._cost(old)
+            self.entries[key] = rows
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= self._cost(evicted)
+                self.counts['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        lookups = self.counts['hits'] + self.counts['refined'] + self.counts['misses']
+        return {
+            'hits': self.counts['hits'],
+            'refined': self.counts['refined'],
+            'misses': self.counts['misses'],
+            'hit_rate': round((lookups - self.counts['misses']) / lookups, 4) if lookups else 0.0,
+            'evictions': self.counts['evictions'],
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,194 @@
+"""
+Inverted full-text index for company search.
+
+Every token of a company's name, director, state, district and sector maps
+to a posting list: the sorted row numbers of the companies containing it.
+Posting lists are stored as gaps between rows in the narrowest array type
+that fits ('B', 'H' or 'I'), which keeps the million-row index small.
+
+A query matches when every term is present; the last term also matches as
+a prefix so results appear while the user is still typing. fuzzy_search
+also accepts other spellings of each term (see fuzzy_index).
+"""
+
+import operator
+import re
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from fuzzy_index import FuzzyIndex
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric tokens of a string"""
+    return _TOKEN.findall(text.lower())
+
+
+class PostingList:
+    """Sorted row numbers, delta encoded"""
+
+    __slots__ = ('deltas',)
+
+    def __init__(self, rows):
+        deltas = array('I', rows[:1])
+        deltas.extend(map(operator.sub, rows[1:], rows))
+        biggest = max(deltas, default=0)
+        if biggest < 1 << 8:
+            self.deltas = array('B', deltas)
+        elif biggest < 1 << 16:
+            self.deltas = array('H', deltas)
+        else:
+            self.deltas = deltas
+
+    @classmethod
+    def from_deltas(cls, deltas):
+        """Posting list over deltas encoded earlier (e.g. mapped from a file)"""
+        posting = cls.__new__(cls)
+        posting.deltas = deltas
+        return posting
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def rows(self):
+        return array('I', accumulate(self.deltas))
+
+
+class SearchIndex:
+    """Token -> PostingList over the searchable fields of a CompanyStore"""
+
+    def __init__(self, store):
+        self.postings = {}
+        self.vocabulary = []
+        self.fuzzy = None
+        self._build(store)
+
+    @classmethod
+    def from_postings(cls, postings):
+        """Index over posting lists built earlier (e.g. mapped from a file)"""
+        index = cls.__new__(cls)
+        index.postings = postings
+        index.vocabulary = sorted(postings)
+        index.fuzzy = None
+        return index
+
+    def _build(self, store):
+        building = {}
+        text_tokens = {}
+
+        def tokens_of(text):
+            tokens = text_tokens.get(text)
+            if tokens is None:
+                tokens = text_tokens[text] = frozenset(tokenize(text))
+            return tokens
+
+        # Categorical values are tokenized once per distinct value
+        category_tokens = [
+            (column.codes, [frozenset(tokenize(value)) for value in column.values])
+            for column in (store.state, store.district, store.sector)
+        ]
+
+        for row in range(len(store)):
+            tokens = tokens_of(store.name[row]) | tokens_of(store.director[row])
+            for codes, value_tokens in category_tokens:
+                tokens = tokens | value_tokens[codes[row]]
+            for token in tokens:
+                rows = building.get(token)
+                if rows is None:
+                    rows = building[token] = array('I')
+                rows.append(row)
+
+        self.postings = {token: PostingList(rows) for token, rows in building.items()}
+        self.vocabulary = sorted(self.postings)
+
+    def term_postings(self, term, prefix=False):
+        """Posting lists of the term (or of every token starting with it)"""
+        if not prefix:
+            posting = self.postings.get(term)
+            return [posting] if posting else []
+
+        start = bisect_left(self.vocabulary, term)
+        matches = []
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.append(self.postings[token])
+        return matches
+
+    def term_rows(self, term, prefix=False):
+        """Rows containing the term (or any token starting with it)"""
+        return _union(self.term_postings(term, prefix))
+
+    def refine(self, rows, terms, start=0):
+        """Sorted rows of a superset result that also match terms[start:] (the last
+        term as a prefix).
+
+        Each matching token's rows are intersected with the candidates instead
+        of first merging them all, which is what makes narrowing a cached
+        result cheaper than searching again.
+        """
+        candidates = set(rows)
+        last = len(terms) - 1
+        for i in range(start, len(terms)):
+            matched = set()
+            for posting in self.term_postings(terms[i], prefix=i == last):
+                matched.update(candidates.intersection(posting.rows()))
+            candidates = matched
+            if not candidates:
+                break
+        return array('I', sorted(candidates))
+
+    def search(self, query):
+        """Sorted rows matching every term of the query, or None for an empty query"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+
+        lists = [self.term_rows(term) for term in terms[:-1]]
+        lists.append(self.term_rows(terms[-1], prefix=True))
+        return _intersect(lists)
+
+    def fuzzy_search(self, query):
+        """Like search, but each term also matches the tokens spelt like it"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        if self.fuzzy is None:
+            self.fuzzy = FuzzyIndex(self.vocabulary)
+
+        lists = []
+        last = len(terms) - 1
+        for i, term in enumerate(terms):
+            postings = self.term_postings(term, prefix=i == last)
+            postings.extend(self.postings[token] for token in self.fuzzy.similar(term)
+                            if not (token == term or i == last and token.startswith(term)))
+            lists.append(_union(postings))
+        return _intersect(lists)
+
+
+def _union(postings):
+    """Sorted rows in any of the posting lists"""
+    if len(postings) <= 1:
+        return postings[0].rows() if postings else array('I')
+    merged = set()
+    for posting in postings:
+        merged.update(posting.rows())
+    return array('I', sorted(merged))
+
+
+def _intersect(lists):
+    """Sorted rows in all of the row arrays, smallest first"""
+    lists.sort(key=len)
+    if not lists[0]:
+        return array('I')
+    if len(lists) == 1:
+        return lists[0]
+    result = set(lists[0])
+    for rows in lists[1:]:
+        result.intersection_update(rows)
+        if not result:
+            break
+    return array('I', sorted(result))
@@ -0,0 +1,137 @@
+"""
+As-you-type suggestions over company names, directors and districts.
+
+Every distinct value is one entry with a popularity: the number of
+companies with that name, run by that director or in that district. Each
+word of an entry can start a match ("sha" suggests both "Shah Textiles" and
+"Priya Sharma"), so the index is one sorted array of (entry, word offset)
+pairs ordered by the text from that word on. A prefix is a contiguous range
+of it found by binary search, and only the entry texts are kept as strings.
+
+Short prefixes cover huge ranges ("s" matches a fifth of all words), so
+the best entries of every prefix whose range is longer than SCAN_LIMIT are
+computed once when the index is built; any other prefix's range is small
+enough to rank on the spot. Either way a lookup stays well under 5 ms on
+the million-company dataset.
+"""
+
+import heapq
+import re
+import sys
+from array import array
+from bisect import bisect_left
+
+KINDS = ('name', 'director', 'district')
+
+# Most suggestions a lookup returns
+MAX_SUGGESTIONS = 10
+
+# Ranges up to this many words are ranked per lookup; longer ones are precomputed
+SCAN_LIMIT = 2000
+
+_WORD = re.compile(r'[a-z0-9]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalise(text):
+    """Lower case with runs of whitespace collapsed, as entries are matched"""
+    return _SPACES.sub(' ', text.lower()).lstrip()
+
+
+def _upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix, or None
+    when there is none (the prefix is all U+10FFFF)"""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SuggestIndex:
+    """Sorted word-start array over (text, kind, popularity) entries"""
+
+    def __init__(self, values):
+        self.texts = []
+        self.lowered = []
+        self.kinds = array('B')
+        self.counts = array('I')
+        starts = []
+        for text, kind, count in values:
+            if not text:
+                continue
+            entry = len(self.texts)
+            lowered = normalise(text)
+            self.texts.append(text)
+            self.lowered.append(lowered)
+            self.kinds.append(KINDS.index(kind))
+            self.counts.append(count)
+            starts.extend((entry, match.start()) for match in _WORD.finditer(lowered))
+
+        lowered = self.lowered
+        starts.sort(key=lambda start: lowered[start[0]][start[1]:])
+        self.entries = array('I', (entry for entry, _ in starts))
+        self.offsets = array('I', (offset for _, offset in starts))
+        self.top = {}
+        if starts:
+            self._precompute('', 0, len(starts))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _key(self, i):
+        return self.lowered[self.entries[i]][self.offsets[i]:]
+
+    def _range(self, prefix, lo=0, hi=None):
+        hi = len(self.entries) if hi is None else hi
+        lo = bisect_left(range(len(self.entries)), prefix, lo, hi, key=self._key)
+        return lo, self._end(prefix, lo, hi)
+
+    def _end(self, prefix, lo, hi):
+        """First position in [lo, hi) past the words starting with prefix"""
+        bound = _upper_bound(prefix)
+        if bound is None:
+            return hi
+        return bisect_left(range(len(self.entries)), bound, lo, hi, key=self._key)
+
+    def _best(self, entries, k=MAX_SUGGESTIONS):
+        """The k most popular distinct entries, ties in alphabetical order"""
+        return heapq.nsmallest(k, set(entries),
+                               key=lambda entry: (-self.counts[entry], self.lowered[entry]))
+
+    def _precompute(self, prefix, lo, hi):
+        """Best entries for the words in [lo, hi), which all start with prefix;
+        stored for every prefix whose range is too long to rank per lookup"""
+        if hi - lo <= SCAN_LIMIT:
+            return self._best(self.entries[lo:hi])
+
+        # Words equal to the prefix sort first; the rest split by their next character
+        candidates = []
+        depth = len(prefix)
+        i = lo
+        while i < hi and len(self._key(i)) == depth:
+            candidates.append(self.entries[i])
+            i += 1
+        while i < hi:
+            child = prefix + self._key(i)[depth]
+            end = self._end(child, i, hi)
+            candidates.extend(self._precompute(child, i, end))
+            i = end
+
+        best = self._best(candidates)
+        if prefix:
+            self.top[prefix] = best
+        return best
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Up to limit suggestions for a partly typed query, most popular first"""
+        prefix = normalise(query)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        best = self.top.get(prefix)
+        if best is None:
+            lo, hi = self._range(prefix)
+            best = self._best(self.entries[lo:hi], limit)
+        return [{'text': self.texts[entry], 'type': KINDS[self.kinds[entry]],
+                 'companies': self.counts[entry]}
+                for entry in best[:limit]]
@@ -0,0 +1,123 @@
+import json
+import os
+
+import pytest
+from flask import Flask
+
+import company_models  # noqa: F401  (registers the tables)
+from company_db import SqlCompanyStore
+from company_store import CompanyStore, init_store
+from extensions import db
+from import_companies import import_companies
+
+# Small dataset shared by the store tests. Ids have gaps (4, 9) and some
+# companies lack a sector, employee band, year, phone or director.
+COMPANIES = [
+    {'id': 1, 'name': 'Sharma Textiles', 'director': 'Ravi Sharma', 'phone': '+91 9876543210',
+     'email': 'info@sharmatextiles.com', 'website': '', 'state': 'Bihar', 'district': 'Patna',
+     'address': '12 Plot, Gandhi Marg, Patna', 'pincode': '800001', 'sector': 'Textiles',
+     'established': 1994, 'employees': '1-10'},
+    {'id': 2, 'name': 'Patna Software', 'director': 'Anita Verma', 'phone': '+91 9123456780',
+     'email': 'info@gmail.com', 'website': 'https://www.patnasoftware.in', 'state': 'Bihar',
+     'district': 'Patna', 'address': '4 Tower, Boring Road, Patna', 'pincode': '800002',
+     'sector': 'IT', 'established': 2003, 'employees': '11-50'},
+    {'id': 3, 'name': 'Gaya Sharma Foods', 'director': 'Mohan Das', 'phone': None,
+     'email': '', 'website': '', 'state': 'Bihar', 'district': 'Gaya', 'address': '',
+     'pincode': '', 'sector': None, 'established': None, 'employees': None},
+    {'id': 5, 'name': 'Pune Infotech', 'director': 'Sunil Sharma', 'phone': '020-2345678',
+     'email': 'info@puneinfotech.com', 'website': '', 'state': 'Maharashtra', 'district': 'Pune',
+     'address': '9 Plaza, FC Road, Pune', 'pincode': '411001', 'sector': 'IT',
+     'established': 2011, 'employees': '1-10'},
+    {'id': 6, 'name': 'Konkan Exports', 'director': 'Leela Naik', 'phone': '+91 9988776655',
+     'email': 'info@konkan.co.in', 'website': '', 'state': 'Maharashtra', 'district': 'Ratnagiri',
+     'address': '', 'pincode': '415612', 'sector': 'Exports', 'established': 1999,
+     'employees': '51-200'},
+    {'id': 7, 'name': 'Sharma Tea House', 'director': 'Priya Sharma', 'phone': '+91 9000000001',
+     'email': 'info@sharmatea.in', 'website': '', 'state': 'Assam', 'district': 'Jorhat',
+     'address': '', 'pincode': '785001', 'sector': 'Food Processing', 'established': 1990,
+     'employees': '11-50'},
+    {'id': 8, 'name': 'Mahalaxmi Vastra Bhandar (महालक्ष्मी)', 'director': None,
+     'phone': '+91 9000000002', 'email': '', 'website': '', 'state': 'Goa',
+     'district': 'Panaji', 'address': '', 'pincode': '403001', 'sector': 'Textiles',
+     'established': 2008, 'employees': '11-50'},
+    {'id': 10, 'name': 'Verma Steel', 'director': 'Sunil Verma', 'phone': '+91 9000000003',
+     'email': 'info@vermasteel.com', 'website': '', 'state': 'Assam', 'district': 'Guwahati',
+     'address': '', 'pincode': '781001', 'sector': 'Steel', 'established': 2015,
+     'employees': '201-500'},
+    {'id': 11, 'name': 'Sree Narayana Traders', 'director': 'Suresh Menon',
+     'phone': '+91 9000000004', 'email': 'info@sreenarayana.in', 'website': '', 'state': 'Kerala',
+     'district': 'Kochi', 'address': '', 'pincode': '682001', 'sector': 'Trading',
+     'established': 2020, 'employees': '1-10'},
+    {'id': 12, 'name': 'Spice Coast Exports', 'director': 'Sajan Thomas',
+     'phone': '+91 9000000005', 'email': 'info@spicecoast.in', 'website': '', 'state': 'Kerala',
+     'district': 'Kochi', 'address': '', 'pincode': '682002', 'sector': 'Exports',
+     'established': 2020, 'employees': '1-10'},
+]
+
+
+@pytest.fixture(scope='session')
+def companies_json(tmp_path_factory):
+    """COMPANIES saved as data/companies.json in a temporary directory"""
+    path = tmp_path_factory.mktemp('dataset') / 'companies.json'
+    path.write_text(json.dumps(COMPANIES, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def store():
+    """In-memory store of COMPANIES with its row indexes built"""
+    store = CompanyStore()
+    for company in COMPANIES:
+        store.append(company)
+    store.build_indexes()
+    return store
+
+
+@pytest.fixture(scope='session')
+def sql_app(tmp_path_factory, companies_json):
+    """Flask app on a SQLite database COMPANIES was imported into"""
+    db_path = str(tmp_path_factory.mktemp('database') / 'directory.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    import_companies(companies_json, db_path)
+    return app
+
+
+@pytest.fixture
+def stores(sql_app, companies_json):
+    """The in-memory and the SQL store over COMPANIES"""
+    with sql_app.app_context():
+        yield CompanyStore.from_json(companies_json), SqlCompanyStore()
+
+
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory, companies_json):
+    """The directory's Flask app on a temporary database COMPANIES was imported into"""
+    db_path = str(tmp_path_factory.mktemp('web') / 'directory.db')
+    settings = {'DATABASE_URL': f"sqlite:///{db_path}",
+                'COMPANY_DATA_DIR': os.path.dirname(companies_json)}
+    saved = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        # Skipped where the app cannot be imported (e.g. a checkout without its models module)
+        app = pytest.importorskip('app', exc_type=ImportError).app
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name)
+            else:
+                os.environ[name] = value
+    import_companies(companies_json, db_path)
+    return app
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def client(request, web_app, companies_json):
+    """Test client of the app serving COMPANIES from memory, then from SQLite"""
+    with web_app.app_context():
+        init_store(os.path.dirname(companies_json),
+                   SqlCompanyStore() if request.param == 'sql' else None)
+    return web_app.test_client()
@@ -0,0 +1,33 @@
+from suggest_index import MAX_SUGGESTIONS
+
+
+def suggest(client, query_string):
+    response = client.get('/api/suggest', query_string=query_string)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_most_popular_first(client):
+    # Patna is the district of two companies, the rest appear once
+    assert suggest(client, {'q': 'pat'})['suggestions'] == [
+        {'text': 'Patna', 'type': 'district', 'companies': 2},
+        {'text': 'Patna Software', 'type': 'name', 'companies': 1},
+    ]
+    # Ties in alphabetical order; any word of a name or director can match
+    assert [s['text'] for s in suggest(client, {'q': 'SHARMA'})['suggestions']] == [
+        'Gaya Sharma Foods', 'Priya Sharma', 'Ravi Sharma', 'Sharma Tea House',
+        'Sharma Textiles', 'Sunil Sharma']
+
+
+def test_limit_is_clamped(client):
+    assert len(suggest(client, {'q': 's', 'limit': 2})['suggestions']) == 2
+    assert len(suggest(client, {'q': 's', 'limit': 0})['suggestions']) == 1
+    assert len(suggest(client, {'q': 's', 'limit': 500})['suggestions']) == MAX_SUGGESTIONS
+    assert len(suggest(client, {'q': 's', 'limit': 'many'})['suggestions']) == MAX_SUGGESTIONS
+
+
+def test_empty_and_unmatched_queries(client):
+    assert suggest(client, {}) == {'query': '', 'suggestions': []}
+    assert suggest(client, {'q': '   '})['suggestions'] == []
+    assert suggest(client, {'q': 'zzz'}) == {'query': 'zzz', 'suggestions': []}
+    assert suggest(client, {'q': chr(0x10FFFF)})['suggestions'] == []
@@ -0,0 +1,97 @@
+import pytest
+
+from bitmap_index import (MAX_FILTER_DEPTH, Bitmap, BitmapIndex, parse_year_bucket,
+                          validate_filter, year_bucket)
+from company_store import CompanyStore
+
+COMPANIES = [
+    {'id': 10, 'name': 'A', 'state': 'Bihar', 'district': 'Patna', 'sector': 'IT',
+     'established': 1994, 'employees': '1-10'},
+    {'id': 11, 'name': 'B', 'state': 'Bihar', 'district': 'Gaya', 'sector': 'Textiles',
+     'established': 2001, 'employees': '11-50'},
+    {'id': 12, 'name': 'C', 'state': 'Goa', 'district': 'Panaji', 'sector': None,
+     'established': None, 'employees': '1-10'},
+    {'id': 13, 'name': 'D', 'state': 'goa', 'district': 'Margao', 'sector': 'IT',
+     'established': 1999, 'employees': None},
+]
+
+
+@pytest.fixture
+def index():
+    store = CompanyStore()
+    for company in COMPANIES:
+        store.append(company)
+    return BitmapIndex(store)
+
+
+def rows(bitmap):
+    return bitmap.rows_after(limit=100)[0]
+
+
+def test_bitmap_algebra():
+    a = Bitmap.from_rows([2, 3, 70, 200])
+    b = Bitmap.from_rows([3, 70, 71])
+    assert rows(a & b) == [3, 70]
+    assert rows(a | b) == [2, 3, 70, 71, 200]
+    assert rows(a - b) == [2, 200]
+    assert len(a) == 4 and not Bitmap() and a.offset == 2
+    assert Bitmap.from_rows([5, 6]) == Bitmap(0b11, 5)
+
+
+def test_rows_after_and_before():
+    bitmap = Bitmap.from_rows([1, 4, 9, 16, 25])
+    assert bitmap.rows_after(4, limit=2) == ([9, 16], True)
+    assert bitmap.rows_after(16) == ([25], False)
+    assert bitmap.rows_before(16, limit=2) == ([4, 9], True)
+    assert bitmap.rows_before(1) == ([], False)
+
+
+def test_row_at():
+    rows = [3, 5] + list(range(600, 1700, 7)) + [5000]
+    bitmap = Bitmap.from_rows(rows)
+    assert [bitmap.row_at(i) for i in range(len(rows))] == rows
+    assert bitmap.row_at(len(rows)) is None and bitmap.row_at(-1) is None
+    assert Bitmap().row_at(0) is None
+
+
+def test_year_buckets():
+    assert year_bucket(1994) == '1990-1999'
+    assert parse_year_bucket('2000-2009') == (2000, 2009)
+    for label in ('1993-1997', '1990-2009', '1990', 'x-y', '1990-1999 '):
+        with pytest.raises(ValueError):
+            parse_year_bucket(label)
+
+
+def test_evaluate(index):
+    assert rows(index.evaluate({'state': 'GOA'})) == [2, 3]
+    assert rows(index.evaluate({'sector': ['IT', 'Textiles'], 'state': 'Bihar'})) == [0, 1]
+    assert rows(index.evaluate({'or': [{'district': 'Gaya'}, {'established': '1990-1999'}]})) == [0, 1, 3]
+    # NOT keeps companies without a value
+    assert rows(index.evaluate({'not': {'sector': 'IT'}})) == [1, 2]
+    assert rows(index.evaluate({'not': {'employees': '1-10'}})) == [1, 3]
+    assert rows(index.evaluate([])) == [0, 1, 2, 3]
+    assert rows(index.evaluate({'or': []})) == []
+
+
+@pytest.mark.parametrize('expr', [
+    'Bihar', {'city': 'Patna'}, {'and': {'state': 'Bihar'}}, {'state': 5}, {'state': ''},
+    {'sector': ['IT', None]}, {'established': '1993-1997'}, {'established': 1990},
+])
+def test_invalid_filters(index, expr):
+    with pytest.raises(ValueError):
+        index.evaluate(expr)
+
+
+def test_nesting_is_capped():
+    expr = {'state': 'Bihar'}
+    for _ in range(MAX_FILTER_DEPTH):
+        expr = {'not': expr}
+    validate_filter(expr)
+    with pytest.raises(ValueError):
+        validate_filter({'not': expr})
+
+    deep = {'state': 'Bihar'}
+    for _ in range(5000):
+        deep = {'and': [deep]}
+    with pytest.raises(ValueError):
+        validate_filter(deep)
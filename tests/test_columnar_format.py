@@ -0,0 +1,63 @@
+import pytest
+
+from bitmap_index import BitmapIndex
+from columnar_format import ColumnarFile, MappedBitmaps, write_columnar
+from company_store import CompanyStore
+from search_index import SearchIndex
+
+
+def test_columns_round_trip(store, tmp_path):
+    path = str(tmp_path / 'companies.col')
+    write_columnar(store, path)
+    loaded = CompanyStore.from_columnar(path)
+
+    assert len(loaded) == len(store)
+    assert loaded.company(1) == store.company(1)
+    assert loaded.company(5)['phone'] == '020-2345678'  # kept in extras, not packed
+    assert loaded.company(8)['name'] == 'Mahalaxmi Vastra Bhandar (महालक्ष्मी)'
+    assert loaded.company(8)['director'] == ''
+    assert loaded.company(4) is None
+    assert loaded.count(state='bihar') == 3
+    # Without saved search or bitmap indexes, they are built after loading
+    assert loaded.search_index is None and loaded.bitmap_index is None
+
+
+def test_sections_are_narrow_zero_copy_views(store, tmp_path):
+    path = str(tmp_path / 'companies.col')
+    write_columnar(store, path)
+    data = ColumnarFile(path)
+
+    ids = data.section(data.columns['ids']['values'])
+    assert isinstance(ids, memoryview) and ids.format == 'B'
+    assert list(ids) == [1, 2, 3, 5, 6, 7, 8, 10, 11, 12]
+    assert data.section(data.columns['established']['values']).format == 'H'
+    assert data.section(data.columns['state']['codes']).format == 'B'
+    assert data.columns['state']['values'] == ['Bihar', 'Maharashtra', 'Assam', 'Goa', 'Kerala']
+
+
+def test_indexes_round_trip(store, tmp_path):
+    store.search_index = SearchIndex(store)
+    store.bitmap_index = BitmapIndex(store)
+    path = str(tmp_path / 'companies.col')
+    write_columnar(store, path)
+    loaded = CompanyStore.from_columnar(path)
+    assert ColumnarFile(path).counts() == store.count_triples()
+    assert loaded.summary == store.summary
+
+    # Bitmaps stay in the map until a filter uses them
+    states = loaded.bitmap_index.bitmaps['state']
+    assert isinstance(states, MappedBitmaps) and not states.decoded
+    assert loaded.search_index.search('sharma te') == store.search_index.search('sharma te')
+    assert list(loaded.search_index.search('naik')) == [4]
+    for expr in ({'state': 'Bihar'}, {'not': {'sector': 'IT'}}, {'established': '2000-2009'}):
+        assert loaded.bitmap_index.evaluate(expr) == store.bitmap_index.evaluate(expr)
+    assert list(states.decoded) == ['bihar']
+    assert loaded.bitmap_index.names == store.bitmap_index.names
+    assert loaded.facet_search('', {'state': 'Bihar'}) == store.facet_search('', {'state': 'Bihar'})
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'companies.json'
+    path.write_bytes(b'[{"id": 1}]' + bytes(32))
+    with pytest.raises(ValueError):
+        ColumnarFile(str(path))
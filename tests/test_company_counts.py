@@ -0,0 +1,73 @@
+import itertools
+import json
+
+from flask import Flask
+
+from company_db import SqlCompanyStore
+from extensions import db
+from import_companies import import_companies
+
+from conftest import COMPANIES
+
+
+def recount(state='', district='', sector=''):
+    wanted = (state.lower(), district.lower(), sector.lower())
+    return sum(all(not value or (company[field] or '').lower() == value
+                   for field, value in zip(('state', 'district', 'sector'), wanted))
+               for company in COMPANIES)
+
+
+def test_counts_match_a_recount(stores):
+    values = {field: {''} | {company[field] or '' for company in COMPANIES}
+              for field in ('state', 'district', 'sector')}
+    for state, district, sector in itertools.product(*values.values()):
+        expected = recount(state, district, sector)
+        for store in stores:
+            assert store.count(state, district, sector) == expected
+    assert stores[0].count(state='ASSAM', sector='steel') == 1
+
+
+def test_summary_matches_the_memory_store(stores):
+    memory, sql = stores
+    assert sql.summary == memory.summary
+    assert sql.summary['total'] == len(COMPANIES)
+
+
+def test_summary_and_fts_follow_a_reimport(tmp_path):
+    db_path = str(tmp_path / 'directory.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    first, second = tmp_path / 'all.json', tmp_path / 'bihar.json'
+    first.write_text(json.dumps(COMPANIES), encoding='utf-8')
+    second.write_text(json.dumps([c for c in COMPANIES if c['state'] == 'Bihar']), encoding='utf-8')
+
+    with app.app_context():
+        db.create_all()
+        store = SqlCompanyStore(version_ttl=0)
+        assert not store.has_fts and store.summary['total'] == 0
+        import_companies(str(first), db_path)
+        assert store.has_fts and store.summary['total'] == len(COMPANIES)
+        import_companies(str(second), db_path)
+        assert store.summary['total'] == store.count() == 3
+        assert list(store.summary['states']) == ['Bihar']
+
+
+def test_version_is_reread_after_its_ttl(tmp_path, companies_json, monkeypatch):
+    db_path = str(tmp_path / 'directory.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    now = [1000.0]
+    monkeypatch.setattr('company_db.time.monotonic', lambda: now[0])
+
+    with app.app_context():
+        db.create_all()
+        import_companies(companies_json, db_path)
+        store = SqlCompanyStore(version_ttl=5)
+        first = store.version
+        import_companies(companies_json, db_path)
+        now[0] += 4
+        assert store.version == first  # no query within the TTL
+        now[0] += 1
+        assert store.version != first and store.version.startswith('import:2:')
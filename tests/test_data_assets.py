@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import json
+import os
+
+import pytest
+from flask import Flask
+
+from data_assets import asset_manifest, brotli, compress_assets, send_data_asset
+
+COMPANIES = json.dumps([{'id': i, 'name': f'Company {i}', 'state': 'Bihar'}
+                        for i in range(1, 500)]).encode()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'shards').mkdir()
+    (tmp_path / 'companies_1million.json').write_bytes(COMPANIES)
+    os.link(tmp_path / 'companies_1million.json', tmp_path / 'companies.json')
+    (tmp_path / 'shards' / 'bihar.bin').write_bytes(bytes(range(256)) * 8)
+    (tmp_path / 'notes.txt').write_text('not served')
+    compress_assets(str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def client(data_dir):
+    app = Flask(__name__)
+
+    @app.route('/data/<path:filename>')
+    def data_file(filename):
+        return send_data_asset(str(data_dir), filename)
+
+    return app.test_client()
+
+
+def test_manifest_and_copies(data_dir):
+    manifest = json.loads((data_dir / 'assets.json').read_text())
+    assert sorted(manifest) == ['companies.json', 'companies_1million.json', 'shards/bihar.bin']
+    entry = manifest['companies.json']
+    assert entry == manifest['companies_1million.json']
+    assert entry['etag'] == hashlib.sha256(COMPANIES).hexdigest()
+    assert gzip.decompress((data_dir / 'companies.json.gz').read_bytes()) == COMPANIES
+    assert entry['gzip'] == os.path.getsize(data_dir / 'companies.json.gz') < len(COMPANIES)
+    if brotli is not None:
+        assert brotli.decompress((data_dir / 'companies.json.br').read_bytes()) == COMPANIES
+
+    # Unchanged files keep their copies on a rerun
+    before = os.stat(data_dir / 'shards' / 'bihar.bin.gz').st_mtime_ns
+    compress_assets(str(data_dir))
+    assert os.stat(data_dir / 'shards' / 'bihar.bin.gz').st_mtime_ns == before
+
+
+def test_smallest_accepted_encoding(client):
+    plain = client.get('/data/companies.json')
+    assert 'Content-Encoding' not in plain.headers and plain.data == COMPANIES
+    assert plain.mimetype == 'application/json'
+
+    gzipped = client.get('/data/companies.json', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.data) == COMPANIES
+    assert 'Accept-Encoding' in gzipped.headers['Vary']
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+
+    best = client.get('/data/companies.json', headers={'Accept-Encoding': 'gzip, br'})
+    assert best.headers['Content-Encoding'] == ('br' if brotli is not None else 'gzip')
+
+
+def test_etag_gives_not_modified(client):
+    first = client.get('/data/shards/bihar.bin', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['ETag'].strip('"').endswith('-gzip')
+    again = client.get('/data/shards/bihar.bin', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+
+def test_range_requests(client, data_dir):
+    part = client.get('/data/companies.json', headers={'Range': 'bytes=0-9'})
+    assert part.status_code == 206 and part.data == COMPANIES[:10]
+    # With an encoding the range is of the compressed bytes
+    part = client.get('/data/companies.json', headers={'Range': 'bytes=10-', 'Accept-Encoding': 'gzip'})
+    assert part.status_code == 206
+    assert part.data == (data_dir / 'companies.json.gz').read_bytes()[10:]
+
+
+def test_changed_file_is_served_as_is(client, data_dir):
+    changed = COMPANIES.replace(b'Bihar', b'Assam')
+    (data_dir / 'shards' / 'bihar.bin').write_bytes(changed)
+    response = client.get('/data/shards/bihar.bin', headers={'Accept-Encoding': 'gzip, br'})
+    assert 'Content-Encoding' not in response.headers and response.data == changed
+
+
+@pytest.mark.parametrize('path', ['notes.txt', 'missing.json', '../companies.json', 'shards'])
+def test_only_data_files_are_served(client, path):
+    assert client.get(f'/data/{path}').status_code == 404
+
+
+def test_manifest_is_reread_when_it_changes(data_dir):
+    assert 'shards/bihar.bin' in asset_manifest(str(data_dir))
+    (data_dir / 'assets.json').write_text('{}')
+    os.utime(data_dir / 'assets.json', ns=(1, 1))
+    assert asset_manifest(str(data_dir)) == {}
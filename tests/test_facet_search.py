@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.mark.parametrize('query, filters', [
+    ('', {}),
+    ('', {'state': 'Bihar'}),
+    ('', {'sector': 'IT', 'employees': ''}),
+    ('sharma', {}),
+    ('sharma', {'state': 'bihar', 'established': '1990-1999'}),
+])
+def test_stores_agree(stores, query, filters):
+    memory, sql = (store.facet_search(query, filters, limit=2) for store in stores)
+    assert [c['id'] for c in memory['companies']] == [c['id'] for c in sql['companies']]
+    assert (memory['total'], memory['has_more']) == (sql['total'], sql['has_more'])
+    assert memory['facets'] == sql['facets']
+
+
+def test_counts_leave_out_missing_values_and_own_filter(stores):
+    memory, _ = stores
+    facets = memory.facet_search('', {'state': 'Bihar'})['facets']
+    # A selected facet still lists its alternatives
+    assert facets['state'] == {'Bihar': 3, 'Maharashtra': 2, 'Assam': 2, 'Goa': 1, 'Kerala': 2}
+    assert facets['sector'] == {'Textiles': 1, 'IT': 1}
+    assert facets['established'] == {'1990-1999': 1, '2000-2009': 1}
@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.mark.parametrize('expr', [
+    {},
+    {'state': 'bihar'},
+    {'sector': ['IT', 'Exports'], 'state': 'Maharashtra'},
+    {'not': {'sector': 'IT'}},
+    {'not': {'employees': ['1-10', '11-50']}},
+    {'not': {'established': '1990-1999'}},
+    {'not': {'or': [{'sector': 'IT'}, {'employees': '1-10'}]}},
+    {'and': [{'state': 'Bihar'}, {'not': {'not': {'sector': 'Textiles'}}}]},
+    {'or': [{'district': 'Pune'}, {'established': ['1990-1999', '2000-2009']}]},
+    {'or': []},
+    [],
+])
+def test_stores_agree(stores, expr):
+    memory, sql = (store.filter_page(expr) for store in stores)
+    assert [c['id'] for c in memory['companies']] == [c['id'] for c in sql['companies']]
+    assert memory['total'] == sql['total']
+
+
+@pytest.mark.parametrize('expr', [{}, {'state': 'assam'}, {'not': {'sector': 'IT'}}])
+def test_id_at_an_offset(stores, expr):
+    for store in stores:
+        ids = [c['id'] for c in store.filter_page(expr, limit=100)['companies']]
+        assert [store.filter_id_at(expr, i) for i in range(len(ids) + 1)] == ids + [None]
+        assert store.filter_count(expr) == len(ids)
+
+
+def test_not_keeps_companies_without_a_value(stores):
+    _, sql = stores
+    ids = [c['id'] for c in sql.filter_page({'not': {'sector': 'IT'}})['companies']]
+    assert ids == [1, 3, 6, 7, 8, 10, 11, 12]
+
+
+@pytest.mark.parametrize('expr', [
+    {'established': '1993-1997'}, {'state': ''}, {'sector': 7}, {'town': 'Pune'},
+    {'and': {'state': 'Goa'}},
+])
+def test_stores_reject_alike(stores, expr):
+    for store in stores:
+        with pytest.raises(ValueError):
+            store.filter_page(expr)
+
+
+def test_deep_nesting_is_a_value_error(stores):
+    expr = {'state': 'Goa'}
+    for _ in range(2000):
+        expr = {'not': expr}
+    for store in stores:
+        with pytest.raises(ValueError):
+            store.filter_page(expr)
+
+
+@pytest.mark.parametrize('missing', [4, 9])
+def test_cursor_on_a_missing_id(stores, missing):
+    # A cursor may name a company that was since deleted; no neighbour is skipped
+    for store in stores:
+        after = [c['id'] for c in store.filter_page({}, after=missing, limit=2)['companies']]
+        before = [c['id'] for c in store.filter_page({}, before=missing, limit=2)['companies']]
+        listed = [c['id'] for c in store.page(after_id=missing, limit=2)[0]]
+        assert after == listed == [missing + 1, missing + 2]
+        assert before == [c['id'] for c in store.page(before_id=missing, limit=2)[0]]
+        assert before == ([2, 3] if missing == 4 else [7, 8])
@@ -0,0 +1,54 @@
+from company_store import CompanyStore
+from fuzzy_index import MAX_EXPANSIONS, FuzzyIndex, phonetic_key, similarity, trigrams
+from search_index import SearchIndex
+
+VOCABULARY = ['shree', 'shri', 'sri', 'agarwal', 'aggarwal', 'agrawal', 'bhatia', 'batia',
+              'verma', 'sharma', 'textiles', 'steel', 'it', '2003']
+
+
+def test_phonetic_keys_fold_spellings():
+    assert phonetic_key('shree') == phonetic_key('shri') == phonetic_key('sri') == 'sri'
+    assert phonetic_key('aggarwal') == phonetic_key('agarwal') == 'agarval'
+    assert phonetic_key('bhatia') == phonetic_key('batia')
+
+
+def test_trigrams_and_similarity():
+    assert trigrams('sri') == {'  s', ' sr', 'sri', 'ri '}
+    assert similarity('sri', 'sri') == 1
+    assert similarity('sri', 'xyz') == 0
+    assert 0 < similarity('agarval', 'agraval') < 1
+
+
+def test_similar_tokens():
+    index = FuzzyIndex(VOCABULARY)
+    # Same phonetic key first, then the closest other keys
+    assert set(index.similar('shri')) == {'shree', 'shri', 'sri'}
+    assert index.similar('agarwaal')[:2] == ['agarwal', 'aggarwal']
+    assert 'sharma' not in index.similar('verma')
+    assert 'bhatia' in index.similar('batia')
+    assert 'textiles' in index.similar('textils')
+    assert index.similar('sharma') == ['sharma']
+    # Short terms and numbers are only matched exactly
+    assert index.similar('it') == [] and index.similar('2003') == []
+    assert 'it' not in index.keys and len(index) == len(index.keys)
+
+
+def test_expansion_limit():
+    index = FuzzyIndex([f"sharm{letter}" for letter in 'abcdefghijklmnopqrstuvxyz'])
+    assert len(index.similar('sharma')) == MAX_EXPANSIONS
+    assert len(index.similar('sharma', limit=3)) == 3
+
+
+def test_fuzzy_search_finds_other_spellings():
+    store = CompanyStore()
+    for i, name in enumerate(('Shree Ganesh Textiles', 'Aggarwal Steel', 'Batia Foods',
+                              'Verma Traders')):
+        store.append({'id': i + 1, 'name': name, 'state': 'Bihar', 'district': 'Patna'})
+    index = SearchIndex(store)
+
+    assert list(index.search('shri ganesh')) == []
+    assert list(index.fuzzy_search('shri ganesh')) == [0]
+    assert list(index.fuzzy_search('agarwal stee')) == [1]
+    assert list(index.fuzzy_search('bhatia')) == [2]
+    assert list(index.fuzzy_search('vermaa patna')) == [3]
+    assert index.fuzzy_search('  ') is None
@@ -0,0 +1,89 @@
+import importlib
+import json
+import os
+import random
+
+import pytest
+
+STATES = [
+    {'name': 'Bihar', 'districts': ['Patna', 'Gaya', 'Muzaffarpur']},
+    {'name': 'Goa', 'districts': ['North Goa', 'South Goa']},
+]
+
+
+@pytest.fixture(scope='module')
+def generator(tmp_path_factory):
+    # The generator reads data/states.json when it is imported
+    folder = tmp_path_factory.mktemp('generator')
+    (folder / 'data').mkdir()
+    (folder / 'data' / 'states.json').write_text(json.dumps(STATES))
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        return importlib.import_module('generate_million_companies')
+    finally:
+        os.chdir(cwd)
+
+
+def test_batch_fields(generator):
+    random.seed(1)
+    companies = generator.generate_company_batch(101, 300, STATES[0])
+    assert [company['id'] for company in companies] == list(range(101, 401))
+
+    low, high = generator.STATE_PINCODE_RANGES['Bihar']
+    for company in companies:
+        assert company['state'] == 'Bihar'
+        assert company['district'] in STATES[0]['districts']
+        assert low <= int(company['pincode']) <= high
+        assert company['address'].endswith(f"{company['district']}, Bihar - {company['pincode']}")
+        assert 1980 <= company['established'] <= 2024
+        assert company['employees'] in generator.EMPLOYEE_RANGES
+        assert company['sector'] in generator.business_sectors
+        assert len(company['phone']) == 14 and company['phone'][4] in '6789'
+        assert company['email'].startswith('info@')
+        if company['website']:
+            assert company['website'].startswith('https://www.')
+    # The 60/40 website split and the name patterns all show up
+    assert 100 < sum(bool(company['website']) for company in companies) < 260
+    assert any(' & ' in company['name'] for company in companies)
+
+
+def test_shards_are_deterministic(generator):
+    task = (7, 1, 0, 1, 50, 0)
+    first = generator.generate_shard(task)
+    random.seed('something else')
+    assert generator.generate_shard(task) == first
+    assert generator.generate_shard((8, 1, 0, 1, 50, 0))[1] != first[1]
+
+
+def test_plan_shards_assigns_consecutive_ids(generator):
+    tasks = generator.plan_shards({'Bihar': generator.SHARD_SIZE + 5, 'Goa': 3}, seed=1)
+    assert [(state, shard, first, count) for _, state, shard, first, count, _ in tasks] == [
+        (0, 0, 1, generator.SHARD_SIZE),
+        (0, 1, generator.SHARD_SIZE + 1, 5),
+        (1, 0, generator.SHARD_SIZE + 6, 3),
+    ]
+
+
+@pytest.mark.parametrize('file_format', ['json', 'ndjson'])
+def test_output_does_not_depend_on_workers(generator, tmp_path, monkeypatch, file_format):
+    # Several small shards per state, so workers finish them out of order
+    monkeypatch.setattr(generator, 'SHARD_SIZE', 40)
+    monkeypatch.setattr(generator, 'calculate_state_distribution',
+                        lambda total: {'Bihar': 130, 'Goa': 70})
+    outputs = []
+    for workers in ('1', '3'):
+        folder = tmp_path / workers
+        (folder / 'data').mkdir(parents=True)
+        # For worker processes that import the generator afresh
+        (folder / 'data' / 'states.json').write_text(json.dumps(STATES))
+        monkeypatch.chdir(folder)
+        monkeypatch.setattr('sys.argv', ['generate_million_companies.py', '--count', '200',
+                                         '--seed', '42', '--name-pool', '30',
+                                         '--format', file_format, '--workers', workers])
+        generator.main()
+        outputs.append((folder / 'data' / f'companies_1million.{file_format}').read_bytes())
+    assert outputs[0] == outputs[1]
+    companies = (json.loads(outputs[0]) if file_format == 'json'
+                 else [json.loads(line) for line in outputs[0].splitlines()])
+    assert [company['id'] for company in companies] == list(range(1, 201))
@@ -0,0 +1,49 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from pagination import decode_cursor
+
+
+@pytest.fixture
+def small_pages(client, monkeypatch):
+    # Two companies a page and links up to page 3, so the dataset spans five pages
+    monkeypatch.setattr('routes.PER_PAGE', 2)
+    monkeypatch.setattr('routes.MAX_LEGACY_PAGE', 3)
+    return client
+
+
+def redirect_of(client, query_string):
+    """(id the redirect's cursor continues after, or None; flashed messages)"""
+    response = client.get('/companies', query_string=query_string)
+    assert response.status_code == 302
+    args = parse_qs(urlsplit(response.headers['Location']).query)
+    assert 'page' not in args
+    with client.session_transaction() as session:
+        flashes = session.pop('_flashes', [])
+    if 'cursor' not in args:
+        return None, flashes
+    import routes
+    expr = {facet: value for facet, value in query_string.items() if facet != 'page'}
+    after, _ = decode_cursor(args['cursor'][0], routes._listing_fingerprint(expr))
+    return after, flashes
+
+
+def test_page_links_continue_after_the_previous_page(small_pages):
+    assert redirect_of(small_pages, {'page': 1}) == (None, [])
+    assert redirect_of(small_pages, {'page': 'two'}) == (None, [])
+    assert redirect_of(small_pages, {'page': 2}) == (2, [])
+    assert redirect_of(small_pages, {'page': 3}) == (5, [])  # past the gap at id 4
+
+
+def test_links_past_the_end_land_on_the_last_page(small_pages):
+    # Bihar has three companies: page 2 is its last
+    assert redirect_of(small_pages, {'state': 'Bihar', 'page': 3}) == (2, [])
+    assert redirect_of(small_pages, {'state': 'Goa', 'page': 2}) == (None, [])
+
+
+def test_capped_pages_say_so_only_when_capped(small_pages):
+    after, flashes = redirect_of(small_pages, {'page': 50})
+    assert after == 5 and len(flashes) == 1
+    # Assam's listing ends before the cap, so there is nothing to explain
+    assert redirect_of(small_pages, {'state': 'Assam', 'page': 50}) == (None, [])
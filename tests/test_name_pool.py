@@ -0,0 +1,55 @@
+import copy
+import pickle
+import random
+
+import pytest
+
+from name_pool import NamePool
+
+
+class CountingFaker:
+    """Faker stand-in with numbered values, counting its calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _next(self, kind):
+        self.calls += 1
+        return f"{kind}{self.calls}"
+
+    def first_name(self):
+        return self._next('F')
+
+    def last_name(self):
+        return self._next('L')
+
+    def city(self):
+        return self._next('C')
+
+
+def test_values_are_sampled_once():
+    faker = CountingFaker()
+    pool = NamePool(faker, size=20)
+    cities = {pool.city() for _ in range(200)}
+    assert faker.calls == 20
+    assert cities <= set(pool.values('city'))
+    assert len(pool.choices('city', 50)) == 50 and faker.calls == 20
+
+
+def test_full_names_combine_first_and_last_name_pools():
+    random.seed(3)
+    pool = NamePool(CountingFaker(), size=50)
+    names = [pool.name() for _ in range(2000)] + pool.choices('name', 2000)
+    assert all(first.startswith('F') and last.startswith('L')
+               for first, last in (name.split() for name in names))
+    # Far more distinct directors than the 50 values a pool of whole names would give
+    assert len(set(names)) > 1000
+
+
+def test_copies_and_pickles_without_recursing():
+    pool = NamePool(CountingFaker(), size=5)
+    pool.city()
+    for clone in (copy.copy(pool), copy.deepcopy(pool), pickle.loads(pickle.dumps(pool))):
+        assert clone.values('city') == pool.values('city')
+    with pytest.raises(AttributeError):
+        NamePool.__new__(NamePool).pools
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+from flask import Flask, flash, jsonify, session
+from werkzeug.datastructures import MultiDict
+
+from page_cache import PageCache, page_key
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A small app whose pages count their renders, and its cache and data version"""
+    version = ['import:1']
+    cache = PageCache(lambda: version[0], directory=str(tmp_path / 'pages'))
+    renders = []
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    @app.route('/')
+    @cache.cached
+    def home():
+        renders.append('home')
+        return f"<p>render {len(renders)}</p>"
+
+    @app.route('/notice')
+    @cache.cached
+    def notice():
+        renders.append('notice')
+        flash('Only the first 500 pages can be reached')
+        return "<p>notice</p>"
+
+    @app.route('/api')
+    @cache.cached
+    def api():
+        renders.append('api')
+        return jsonify(renders=len(renders))
+
+    @app.route('/login')
+    def login():
+        session['user_id'] = 1
+        return 'ok'
+
+    return app, cache, version, renders
+
+
+def test_hits_until_the_version_changes(site):
+    app, cache, version, renders = site
+    client = app.test_client()
+    first = client.get('/?page=&state=Goa')
+    assert first.headers['X-Page-Cache'] == 'MISS'
+    again = client.get('/?state=Goa')  # empty arguments do not change the key
+    assert again.headers['X-Page-Cache'] == 'HIT' and again.data == first.data
+    assert renders == ['home']
+
+    version[0] = 'import:2'
+    assert client.get('/?state=Goa').headers['X-Page-Cache'] == 'MISS'
+    assert renders == ['home', 'home']
+    assert cache.stats()['memory_hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_disk_tier_is_shared_and_drops_old_versions(site, tmp_path):
+    app, cache, version, renders = site
+    app.test_client().get('/')
+    other = PageCache(lambda: version[0], directory=cache.directory)
+    key = page_key('home', {}, MultiDict(), version[0])
+    other._use_disk_version(version[0])
+    assert other.get(key) == cache.get(key)
+    assert other.stats()['disk_hits'] == 1
+
+    version[0] = 'import:2'
+    app.test_client().get('/')
+    assert len(os.listdir(cache.directory)) == 1
+    other._use_disk_version('import:1')
+    assert other._disk_get(key) is None
+
+
+def test_pages_that_flash_are_not_cached(site):
+    app, cache, version, renders = site
+    client = app.test_client()
+    assert client.get('/notice').headers['X-Page-Cache'] == 'MISS'
+    # The flash is pending now, so even cacheable pages bypass the cache
+    response = client.get('/')
+    assert 'X-Page-Cache' not in response.headers
+    assert 'X-Page-Cache' not in client.get('/notice').headers
+    assert renders == ['notice', 'home', 'notice']
+    assert cache.stats()['stores'] == 0
+
+
+def test_only_anonymous_html_is_cached(site):
+    app, cache, version, renders = site
+    client = app.test_client()
+    client.get('/api')
+    assert client.get('/api').headers['X-Page-Cache'] == 'MISS'
+    client.get('/login')
+    assert 'X-Page-Cache' not in client.get('/').headers
+    assert cache.stats()['stores'] == 0
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PageCache(lambda: 'v', max_bytes=10)
+    cache.set('a', b'aaaa')
+    cache.set('b', b'bbbb')
+    cache.get('a')
+    cache.set('c', b'cccc')
+    assert cache.get('b') is None and cache.get('a') == b'aaaa'
+    cache.set('big', b'x' * 11)  # larger than the whole tier
+    assert cache.get('big') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['bytes'] == 8
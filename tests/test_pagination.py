@@ -0,0 +1,67 @@
+import base64
+import json
+
+import pytest
+
+from pagination import (InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint,
+                        page_cursors)
+
+
+def forged(direction, position, fingerprint):
+    payload = json.dumps([direction, position, fingerprint]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def test_fingerprint_normalises_case_and_spaces():
+    assert filter_fingerprint(q='Shah  Textiles', state='') == filter_fingerprint(q='shah textiles')
+    assert filter_fingerprint(q='shah') != filter_fingerprint(q='shah', state='Bihar')
+
+
+def test_round_trip_ids_and_ranked_positions():
+    fingerprint = filter_fingerprint(state='Bihar')
+    assert decode_cursor(encode_cursor('after', 42, fingerprint), fingerprint) == (42, None)
+    assert decode_cursor(encode_cursor('before', 7, fingerprint), fingerprint) == (None, 7)
+    token = encode_cursor('after', (-3.5, 12), fingerprint)
+    assert decode_cursor(token, fingerprint, ranked=True) == ((-3.5, 12), None)
+
+
+def test_cursor_from_another_query_is_rejected():
+    token = encode_cursor('after', 42, filter_fingerprint(state='Bihar'))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, filter_fingerprint(state='Goa'))
+
+
+@pytest.mark.parametrize('token', ['', '!!!', 'bm90IGpzb24', forged('sideways', 1, 'f')])
+def test_malformed_tokens(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 'f')
+
+
+@pytest.mark.parametrize('position', [True, -1, 2.5, 'NaN', None, [1.0, 2], ['x', 1]])
+def test_bad_id_positions(position):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(forged('after', position, 'f'), 'f')
+
+
+@pytest.mark.parametrize('position', [5, [True, 1], [1.0, 'y'], [None, 1], [1.0, 2, 3], [1.0, -2]])
+def test_bad_ranked_positions(position):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(forged('after', position, 'f'), 'f', ranked=True)
+
+
+def test_page_cursors():
+    page = [{'id': 3}, {'id': 5}]
+    assert page_cursors([], True, None, None, 'f') == (None, None)
+
+    prev_cursor, next_cursor = page_cursors(page, True, None, None, 'f')
+    assert prev_cursor is None
+    assert decode_cursor(next_cursor, 'f') == (5, None)
+
+    prev_cursor, next_cursor = page_cursors(page, False, 1, None, 'f')
+    assert decode_cursor(prev_cursor, 'f') == (None, 3)
+    assert next_cursor is None
+
+    # Paging backwards: has_more says whether anything precedes the page
+    prev_cursor, next_cursor = page_cursors(page, False, None, 9, 'f')
+    assert prev_cursor is None
+    assert decode_cursor(next_cursor, 'f') == (5, None)
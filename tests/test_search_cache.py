@@ -0,0 +1,72 @@
+from array import array
+
+import pytest
+
+from company_store import CompanyStore
+from search_cache import ENTRY_OVERHEAD, SearchCache
+from search_index import SearchIndex
+
+
+def rows(*values):
+    return array('I', values)
+
+
+def test_exact_and_covering_lookups():
+    cache = SearchCache()
+    cache.put(['sharma', 't'], '', rows(0, 1, 2))
+    assert cache.lookup(['sharma', 't'], '') == (rows(0, 1, 2), None)
+    # "sharma t" covers "sharma te" and "sharma tea house"; term 1 on is left to check
+    assert cache.lookup(['sharma', 'te'], '') == (rows(0, 1, 2), 1)
+    assert cache.lookup(['sharma', 'tea', 'house'], '') == (rows(0, 1, 2), 1)
+    # Not covered: another state, a different first word, a shorter query
+    assert cache.lookup(['sharma', 'te'], 'bihar') == (None, None)
+    assert cache.lookup(['sharmaji', 'te'], '') == (None, None)
+    assert cache.lookup(['sharma'], '') == (None, None)
+    assert cache.stats()['refined'] == 2 and cache.stats()['hits'] == 1
+
+
+def test_one_word_queries_and_fuzzy_results_only_hit_exactly():
+    cache = SearchCache()
+    cache.put(['sha'], '', rows(0, 1, 2))
+    assert cache.lookup(['shar'], '') == (None, None)
+
+    cache = SearchCache()
+    cache.put(['sharma', 'tex'], '', rows(0), fuzzy=True)
+    assert cache.lookup(['sharma', 'tex'], '') == (None, None)
+    assert cache.lookup(['sharma', 'text'], '', fuzzy=True) == (None, None)
+    assert cache.lookup(['sharma', 'tex'], '', fuzzy=True) == (rows(0), None)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cost = 4 * 4 + ENTRY_OVERHEAD
+    cache = SearchCache(max_bytes=2 * cost)
+    cache.put(['a'], '', rows(1, 2, 3, 4))
+    cache.put(['b'], '', rows(1, 2, 3, 4))
+    cache.lookup(['a'], '')
+    cache.put(['c'], '', rows(1, 2, 3, 4))
+    assert [key[0] for key in cache.entries] == [('a',), ('c',)]
+    assert cache.stats()['evictions'] == 1 and cache.size == 2 * cost
+
+    # A result bigger than the whole budget is not cached at all
+    cache.put(['d'], '', array('I', range(1000)))
+    assert len(cache.entries) == 2
+
+
+@pytest.mark.parametrize('terms, start', [
+    (['sharma', 'te'], 1), (['sharma', 'tex'], 1), (['sharma', 'textiles', 'b'], 1),
+    (['sharma', 'textiles', 'b'], 2), (['sharma', 'x'], 1),
+])
+def test_refine_matches_a_fresh_search(store, terms, start):
+    index = SearchIndex(store)
+    superset = index.search(' '.join(terms[:start]) + ' ' + terms[start][:1])
+    assert index.refine(superset, terms, start) == index.search(' '.join(terms))
+
+
+def test_store_results_are_the_same_from_the_cache(store, companies_json):
+    typed = ['s', 'sh', 'sharma', 'sharma t', 'sharma te', 'sharma tex', 'sharma te']
+    fresh = [list(CompanyStore.from_json(companies_json).search_rows(query)) for query in typed]
+    assert [list(store.search_rows(query)) for query in typed] == fresh
+    assert list(store.search_rows('sharma t')) == [0, 5]
+    assert list(store.search_rows('sharma t', state='Bihar')) == [0]
+    stats = store.search_cache.stats()
+    assert stats['refined'] >= 2 and stats['hits'] >= 1
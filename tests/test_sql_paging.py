@@ -0,0 +1,71 @@
+import pytest
+
+from pagination import InvalidCursor, position_of
+
+from conftest import COMPANIES
+
+
+def walk(fetch, limit):
+    """Pages fetched forward by after position, then back by before position
+    from the last page; fetch(after, before, limit) returns (companies, has_more)"""
+    forward, after = [], None
+    while True:
+        companies, has_more = fetch(after, None, limit)
+        forward.append(companies)
+        if not has_more:
+            break
+        after = position_of(companies[-1])
+    backward, before = [], position_of(forward[-1][0])
+    while len(forward) > 1:
+        companies, has_more = fetch(None, before, limit)
+        backward.insert(0, companies)
+        if not has_more:
+            break
+        before = position_of(companies[0])
+    return forward, backward
+
+
+@pytest.mark.parametrize('limit', [1, 3, 4])
+@pytest.mark.parametrize('state', ['', 'assam'])
+def test_keyset_pages_cover_the_listing(stores, limit, state):
+    expected = [c['id'] for c in COMPANIES if not state or c['state'].lower() == state]
+    for store in stores:
+        forward, backward = walk(lambda after, before, limit: store.page(
+            state, after_id=after, before_id=before, limit=limit), limit)
+        assert [c['id'] for page in forward for c in page] == expected
+        assert all(len(page) == limit for page in forward[:-1])
+        # Paging back from the last page returns the pages before it
+        assert backward == forward[:-1]
+
+
+@pytest.mark.parametrize('limit', [1, 2, 4])
+def test_ranked_pages_follow_score_order(stores, limit):
+    memory, sql = stores
+    assert sql.ranks('sharma') and not memory.ranks('sharma')
+    forward, backward = walk(lambda after, before, limit: sql.search_page(
+        'sharma', after=after, before=before, limit=limit), limit)
+    ranked = [(c['score'], c['id']) for page in forward for c in page]
+    assert ranked == sorted(ranked)  # bm25: lower is more relevant
+    assert backward == forward[:-1]
+    # The same companies as the memory store, in relevance order
+    expected = [c['id'] for c in memory.search_results('sharma', limit=100)['companies']]
+    assert sorted(company_id for _, company_id in ranked) == expected
+    assert sql.search_results('sharma', limit=limit)['total'] == len(expected)
+
+
+def test_ranked_pages_need_a_ranked_position(stores):
+    _, sql = stores
+    with pytest.raises(InvalidCursor):
+        sql.search_page('sharma', after=5)
+    # A state-only search is a plain listing, paged by id
+    companies, has_more = sql.search_page('', state='Bihar', after=(0.0, 1), limit=1)
+    assert [c['id'] for c in companies] == [2] and has_more
+
+
+def test_fallback_search_takes_wildcards_literally(stores):
+    # Queries without FTS words use LIKE, where % and _ must not match everything
+    _, sql = stores
+    for query in ('%', '_', '\\', '100%'):
+        assert sql.search_results(query)['total'] == 0
+    companies = sql.search_results('(महालक्ष्मी)')['companies']
+    assert [c['id'] for c in companies] == [8]
@@ -0,0 +1,64 @@
+import sys
+
+import pytest
+
+import suggest_index
+from suggest_index import MAX_SUGGESTIONS, SuggestIndex, _upper_bound, normalise
+
+VALUES = [
+    ('Shah Textiles', 'name', 3),
+    ('Priya Sharma', 'director', 5),
+    ('Sharma  Steel', 'name', 1),
+    ('Shahdol', 'district', 40),
+    ('Ravi Shastri', 'director', 5),
+    ('Patna', 'district', 60),
+    ('', 'name', 99),
+]
+
+
+def texts(results):
+    return [result['text'] for result in results]
+
+
+def test_normalise_and_upper_bound():
+    assert normalise('  Sharma \t Steel ') == 'sharma steel '
+    assert _upper_bound('sha') == 'shb'
+    assert _upper_bound('a' + chr(sys.maxunicode)) == 'b'
+    assert _upper_bound(chr(sys.maxunicode) * 2) is None
+
+
+def test_any_word_can_start_a_match():
+    index = SuggestIndex(VALUES)
+    assert texts(index.suggest('sha')) == ['Shahdol', 'Priya Sharma', 'Ravi Shastri',
+                                           'Shah Textiles', 'Sharma  Steel']
+    assert texts(index.suggest('SHARMA s')) == ['Sharma  Steel']
+    assert texts(index.suggest('tex')) == ['Shah Textiles']
+    assert index.suggest('pat') == [{'text': 'Patna', 'type': 'district', 'companies': 60}]
+    assert index.suggest('xyz') == [] and index.suggest('   ') == []
+
+
+def test_limit_is_capped():
+    index = SuggestIndex(VALUES)
+    assert texts(index.suggest('sha', limit=2)) == ['Shahdol', 'Priya Sharma']
+    assert len(index.suggest('s', limit=100)) <= MAX_SUGGESTIONS
+
+
+def test_top_code_point():
+    index = SuggestIndex(VALUES + [('a' + chr(sys.maxunicode), 'name', 1)])
+    assert index.suggest(chr(sys.maxunicode)) == []
+    assert texts(index.suggest('a' + chr(sys.maxunicode))) == ['a' + chr(sys.maxunicode)]
+
+
+def test_precomputed_prefixes_match_a_scan(monkeypatch):
+    values = [(f"{first} {last}", 'director', (i * 7) % 13)
+              for i, (first, last) in enumerate((first, last)
+                                               for first in ('Amit', 'Anil', 'Asha', 'Bala')
+                                               for last in ('Rao', 'Ray', 'Reddy', 'Roy', 'Rana'))]
+    scanned = SuggestIndex(values)
+    assert scanned.top == {}
+
+    monkeypatch.setattr(suggest_index, 'SCAN_LIMIT', 3)
+    precomputed = SuggestIndex(values)
+    assert {'a', 'r', 'am'} <= set(precomputed.top)
+    for prefix in ('a', 'an', 'r', 're', 'ra', 'amit r', 'b'):
+        assert precomputed.suggest(prefix) == scanned.suggest(prefix), prefix